@@ -0,0 +1,125 @@
+import os
+from collections import OrderedDict
+
+import pygame
+
+
+def scaled(img, scale):
+    # scale is either a multiplier or an exact (width, height)
+    if isinstance(scale, tuple):
+        size = scale
+    else:
+        size = (int(img.get_width() * scale), int(img.get_height() * scale))
+    return pygame.transform.scale(img, size)
+
+
+def animation_paths(folder, animation_types=('Idle', 'Run', 'Jump', 'Death')):
+    # one list of frame paths per animation type, folder/<type>/0.png, 1.png ...
+    paths = []
+    for animation in animation_types:
+        # count the number of files in that animations folder
+        num_of_frames = len(os.listdir(f'{folder}/{animation}'))
+        paths.append([f'{folder}/{animation}/{i}.png' for i in range(num_of_frames)])
+    return paths
+
+
+def decode(key, decoded):
+    # loads, scales and flips the image for a (path, scale, flip) key into the dict decoded without converting
+    # it or touching the cache, so it can run off the main thread. AssetCache.add() converts and caches them
+    img = decoded.get(key)
+    if img is None:
+        path, scale, flip = key
+        if flip:
+            img = pygame.transform.flip(decode((path, scale, False), decoded), True, False)
+        elif scale != 1:
+            img = scaled(decode((path, 1, False), decoded), scale)
+        else:
+            img = pygame.image.load(path)
+        decoded[key] = img
+    return img
+
+
+class AssetCache:
+    # process-wide image cache keyed by (path, scale, flip) so every sprite shares the same surfaces
+    def __init__(self, capacity=512):
+        self.capacity = capacity  # number of images kept before the least recently used one is dropped
+        self.images = OrderedDict()
+        # animation frames stay loaded for as long as the animations that use them, so they are kept here
+        # instead, outside the least recently used order and not counted against capacity
+        self.frames = {}  # (path, scale, flip) -> image
+        self.animations = {}  # (folder, scale, flip) -> list of frame lists
+        self.mapped = None  # the asset bundle's mmap (see bundle.py), unconverted images share its memory
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, scale=1, flip=False):
+        # scale is either a multiplier or an exact (width, height)
+        key = (path, scale, flip)
+        img = self.images.get(key)
+        if img is not None:
+            self.images.move_to_end(key)
+            self.hits += 1
+            return img
+        img = self.frames.get(key)
+        if img is not None:
+            self.hits += 1
+            return img
+
+        self.misses += 1
+        if flip:
+            img = pygame.transform.flip(self.get(path, scale), True, False)
+        elif scale != 1:
+            img = scaled(self.get(path), scale)
+        else:
+            img = pygame.image.load(path)
+            if pygame.display.get_surface() is not None:  # converting needs a display mode
+                img = img.convert_alpha()
+        self.store(key, img)
+        return img
+
+    def __contains__(self, key):
+        return key in self.images or key in self.frames
+
+    def store(self, key, img):
+        self.images[key] = img
+        if len(self.images) > self.capacity:
+            self.images.popitem(last=False)
+
+    def add(self, decoded):
+        # caches images from decode(), converting them here on the main thread
+        for key, img in decoded.items():
+            if key not in self:
+                if pygame.display.get_surface() is not None:
+                    img = img.convert_alpha()
+                self.store(key, img)
+
+    def get_frames(self, paths, scale=1, flip=False):
+        return [self.get(path, scale, flip) for path in paths]
+
+    def get_animations(self, folder, scale=1, flip=False, animation_types=('Idle', 'Run', 'Jump', 'Death')):
+        # one list of frames per animation type, loaded from folder/<type>/0.png, 1.png ...
+        key = (folder, scale, flip)
+        animation_list = self.animations.get(key)
+        if animation_list is None:
+            animation_list = []
+            for paths in animation_paths(folder, animation_types):
+                frames = self.get_frames(paths, scale, flip)
+                for path, img in zip(paths, frames):
+                    self.images.pop((path, scale, flip), None)
+                    self.frames[(path, scale, flip)] = img
+                animation_list.append(frames)
+            self.animations[key] = animation_list
+        return animation_list
+
+    def preload(self, paths, scale=1, flip=False):
+        # load images ahead of time so the first sprite to use them doesn't stall a frame
+        self.get_frames(paths, scale, flip)
+
+    def clear(self):
+        self.images.clear()
+        self.frames.clear()
+        self.animations.clear()
+        self.mapped = None
+
+
+cache = AssetCache()
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+
+import pygame
+
+import assets
+
+
+class ParallaxLayer:
+    def __init__(self, image, scroll_factor, y):
+        self.image = image
+        self.scroll_factor = scroll_factor  # how fast the layer moves compared to the camera
+        self.y = y
+
+
+class ParallaxBackground:
+    # repeats each layer across the screen, layers further back scroll slower
+    def __init__(self, width, height, color, layers, cache_step=None, cache_size=16):
+        self.width = width
+        self.height = height
+        self.color = color
+        self.layers = layers
+        # when cache_step is set the composed background is kept for every cache_step pixels of scroll,
+        # so standing still (or scrolling back over the same spot) costs a single blit
+        self.cache_step = cache_step
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def draw_layers(self, surface, scroll):
+        surface.fill(self.color)
+        for layer in self.layers:
+            width = layer.image.get_width()
+            # only the copies of the image that reach the screen are drawn
+            x = -((scroll * layer.scroll_factor) % width)
+            while x < self.width:
+                surface.blit(layer.image, (x, layer.y))
+                x += width
+
+    def draw(self, surface, scroll):
+        if not self.cache_step:
+            self.draw_layers(surface, scroll)
+            return
+
+        bucket = int(scroll // self.cache_step)
+        bg = self.cache.get(bucket)
+        if bg is None:
+            bg = pygame.Surface((self.width, self.height))
+            if pygame.display.get_surface() is not None:
+                bg = bg.convert()
+            self.draw_layers(bg, bucket * self.cache_step)
+            self.cache[bucket] = bg
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(bucket)
+        surface.blit(bg, (0, 0))
+
+    def clear_cache(self):
+        self.cache.clear()
+
+
+def load_game_background(width, height, color, cache_step=None):
+    # the game's background layers (image, scroll speed, y), back to front. needs a display mode set
+    sky_img = assets.cache.get('../images/background/sky_cloud.png').convert()  # opaque, blits faster
+    mountains_img = assets.cache.get('../images/background/mountain.png')
+    tree_img = assets.cache.get('../images/background/pine1.png')
+    return ParallaxBackground(width, height, color, [
+        ParallaxLayer(sky_img, 0.5, 0),
+        ParallaxLayer(mountains_img, 0.6, height - mountains_img.get_height() - 100),
+        ParallaxLayer(tree_img, 0.8, height - mountains_img.get_height()),
+    ], cache_step=cache_step)
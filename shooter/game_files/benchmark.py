@@ -0,0 +1,300 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import background
+import projectiles
+import renderer
+import simulation
+import sprites
+from settings import *
+from world import World
+
+
+def make_level(cols=10000, enemies=500, seed=0, rows=ROWS):
+    # a synthetic level in the normal tile numbers: solid ground with water pits,
+    # rows of floating platforms and decorations, item boxes, enemies on the ground and an exit at the end
+    rng = np.random.default_rng(seed)
+    data = np.full((rows, cols), -1, dtype=np.int8)
+    ground = rows - 1
+    data[ground] = rng.integers(0, 9, cols)
+    pits = rng.choice(np.arange(10, cols - 10), cols // 40, replace=False)
+    data[ground - 1, pits] = 9  # water sits in the ground
+    data[ground, pits] = 10
+    for row in range(3, ground - 2, 3):
+        # dense platform rows, about half the columns
+        platform = rng.random(cols) < 0.5
+        data[row, platform] = rng.integers(0, 9, platform.sum())
+    free = np.flatnonzero(data[ground - 1] == -1)
+    free = free[(free > 5) & (free < cols - 5)]
+    decorations = rng.choice(free, len(free) // 8, replace=False)
+    data[ground - 1, decorations] = rng.integers(11, 15, len(decorations))
+    free = np.flatnonzero(data[ground - 1] == -1)
+    free = free[(free > 5) & (free < cols - 5)]
+    enemy_cols = rng.choice(free, min(enemies, len(free)), replace=False)
+    data[ground - 1, enemy_cols] = 16
+    free = np.flatnonzero(data[ground - 1] == -1)
+    free = free[(free > 5) & (free < cols - 5)]
+    data[ground - 1, rng.choice(free, cols // 100, replace=False)] = rng.integers(17, 20, cols // 100)
+    data[ground - 1, 2] = 15  # player
+    data[ground - 1, cols - 2] = 20  # exit
+    return data
+
+
+def measure(fn, repeat, warmup=1):
+    # runs fn repeat times (after warmup runs) and returns its timings in milliseconds
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        'repeat': repeat,
+        'min_ms': min(times),
+        'median_ms': statistics.median(times),
+        'mean_ms': statistics.fmean(times),
+        'max_ms': max(times),
+    }
+
+
+def drop_chunks(world, camera):
+    # forgets the baked chunks World.stream would have dropped with the camera here, so benchmarks that
+    # move the camera across the level hold as many as the game does
+    chunk_width = CHUNK_COLS * TILE_SIZE
+    first = (camera.x - STREAM_MARGIN) // chunk_width - 1
+    last = (camera.x + camera.width + STREAM_MARGIN) // chunk_width + 1
+    for i in [i for i in world.chunks if i < first or i > last]:
+        del world.chunks[i]
+
+
+class Benchmarks:
+    # each bench_* method times one subsystem against the synthetic level
+    def __init__(self, cols, enemies, seed, repeat):
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        sprites.preload()
+        self.data = make_level(cols, enemies, seed)
+        self.state = simulation.GameState(seed=seed)
+        self.load()
+        self.repeat = repeat
+
+    def load(self):
+        # the whole level is loaded so the per sprite benchmarks don't depend on where the camera streamed in
+        self.state.load_data(self.data)
+        self.state.world.load_all(self.state)
+
+    def bench_process_data(self):
+        # only the start of the level is built up front, the rest streams in
+        state = self.state
+
+        def process_data():
+            state.clear()
+            world = World()
+            world.process_data(self.data)
+            world.stream(state)
+        result = measure(process_data, max(self.repeat // 10, 3))
+        self.load()
+        return result
+
+    def bench_world_draw(self):
+        # 100 frames spread across the level, chunks are baked as they come into view and dropped as they
+        # leave it like they are when the game streams them
+        state = self.state
+        camera = state.camera
+        positions = range(0, camera.level_width - camera.width, max((camera.level_width - camera.width) // 100, 1))
+
+        queue = renderer.RenderQueue()
+
+        def draw():
+            for x in positions:
+                camera.x = camera.last_x = x
+                state.world.draw(queue, camera)
+                queue.flush(self.screen, False)
+                drop_chunks(state.world, camera)
+        result = measure(draw, self.repeat)
+        result['draws'] = len(positions)
+        camera.reset(camera.level_width)
+        return result
+
+    def bench_render_frame(self):
+        # everything in the world submitted to the render queue and flushed, at 100 spots across the level
+        state = self.state
+        camera = state.camera
+        positions = range(0, camera.level_width - camera.width, max((camera.level_width - camera.width) // 100, 1))
+        queue = renderer.RenderQueue()
+        enemies = list(state.enemy_group)
+        on_screen = []  # the enemies update_enemies would have made active at each spot
+        for x in positions:
+            camera.x = camera.last_x = x
+            on_screen.append([enemy for enemy in enemies if camera.is_visible(enemy.rect)])
+
+        def draw():
+            for x, active in zip(positions, on_screen):
+                camera.x = camera.last_x = x
+                state.active_enemies = active
+                renderer.submit_state(queue, state)
+                queue.flush(self.screen)
+                drop_chunks(state.world, camera)
+        result = measure(draw, self.repeat)
+        result['draws'] = len(positions)
+        camera.reset(camera.level_width)
+        state.active_enemies = enemies
+        return result
+
+    def bench_soldier_move(self):
+        # every enemy walks one step in the direction it is facing
+        state = self.state
+        enemies = list(state.enemy_group)
+
+        def move():
+            for enemy in enemies:
+                enemy.move(state, enemy.direction < 0, enemy.direction > 0)
+                enemy.direction *= -1
+        result = measure(move, self.repeat)
+        result['soldiers'] = len(enemies)
+        return result
+
+    def bench_bullet_update(self, count=1000):
+        # a screen full of bullets, respawned each run so they don't fly off
+        state = self.state
+        rng = np.random.default_rng(1)
+        starts = [(int(x), int(y), int(d)) for x, y, d in zip(rng.integers(0, SCREEN_WIDTH, count),
+                                                             rng.integers(0, SCREEN_HEIGHT - TILE_SIZE, count),
+                                                             rng.choice((-1, 1), count))]
+        bullets = [sprites.Bullet(*start) for start in starts]
+
+        def update():
+            for bullet, start in zip(bullets, starts):
+                bullet.reset(*start)
+            state.bullet_group.add(bullets)
+            state.bullet_group.update(state)
+            state.bullet_group.empty()
+        result = measure(update, self.repeat)
+        result['bullets'] = count
+        return result
+
+    def bench_grenade_update(self, count=200):
+        state = self.state
+        rng = np.random.default_rng(2)
+        starts = [(int(x), int(y), int(d)) for x, y, d in zip(rng.integers(0, SCREEN_WIDTH, count),
+                                                             rng.integers(0, SCREEN_HEIGHT // 2, count),
+                                                             rng.choice((-1, 1), count))]
+        grenades = [sprites.Grenade(*start) for start in starts]
+        health = [(soldier, soldier.health) for soldier in [state.player] + list(state.enemy_group)]
+
+        def update():
+            for grenade, start in zip(grenades, starts):
+                grenade.reset(*start)
+                grenade.timer = 2  # so the second update blows them all up
+            state.grenade_group.add(grenades)
+            state.grenade_group.update(state)
+            state.grenade_group.update(state)
+            for explosion in state.explosion_group.sprites():
+                explosion.kill()
+        result = measure(update, self.repeat)
+        for soldier, hp in health:
+            soldier.health = hp
+        result['grenades'] = count
+        return result
+
+    def bench_projectile_update(self, count=1000):
+        # the same bullets through the numpy projectile system
+        state = self.state
+        rng = np.random.default_rng(1)
+        starts = list(zip(rng.integers(0, SCREEN_WIDTH, count), rng.integers(0, SCREEN_HEIGHT - TILE_SIZE, count),
+                          rng.choice((-1, 1), count)))
+        system = projectiles.ProjectileSystem(count)
+        state.projectiles = system
+        for x, y, d in starts:
+            system.spawn_bullet(x, y, d)
+        saved = {name: getattr(system, name).copy() for name in system.ARRAYS}
+
+        def update():
+            system.count = count
+            for name, array in saved.items():
+                getattr(system, name)[:] = array
+            system.update_bullets(state)
+        result = measure(update, self.repeat)
+        state.projectiles = None
+        result['bullets'] = count
+        return result
+
+    def bench_draw_bg(self):
+        parallax_bg = background.load_game_background(SCREEN_WIDTH, SCREEN_HEIGHT, BG, BG_CACHE_STEP)
+
+        def draw():
+            for scroll in range(0, 700, 7):
+                parallax_bg.draw(self.screen, scroll)
+        result = measure(draw, self.repeat)
+        result['draws'] = 100
+        return result
+
+    def run(self, names=None):
+        results = {}
+        for name in names or BENCHMARKS:
+            results[name] = getattr(self, 'bench_' + name)()
+            print(f"{name:20} {results[name]['median_ms']:9.3f} ms (min {results[name]['min_ms']:.3f})")
+        return results
+
+
+BENCHMARKS = ['process_data', 'world_draw', 'render_frame', 'soldier_move', 'bullet_update', 'grenade_update',
+              'projectile_update', 'draw_bg']
+
+
+def compare(results, baseline, threshold):
+    # returns the benchmarks whose median got more than threshold (a fraction) slower than the baseline
+    regressions = []
+    for name, result in results.items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        change = result['median_ms'] / old['median_ms'] - 1
+        flag = 'REGRESSION' if change > threshold else ''
+        print(f"{name:20} {old['median_ms']:9.3f} -> {result['median_ms']:9.3f} ms {change:+7.1%} {flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the game\'s hot paths on a synthetic stress level.')
+    parser.add_argument('names', nargs='*', help=f'benchmarks to run (default: all of {", ".join(BENCHMARKS)})')
+    parser.add_argument('--cols', type=int, default=10000, help='width of the synthetic level in tiles')
+    parser.add_argument('--enemies', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=30, help='timed runs of each benchmark')
+    parser.add_argument('--output', help='write the results to this json file')
+    parser.add_argument('--compare', help='json file from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='slowdown (as a fraction) that counts as a regression in --compare mode')
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark {name}')
+
+    simulation.init_headless()
+    benchmarks = Benchmarks(args.cols, args.enemies, args.seed, args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'numpy': np.__version__,
+        'params': {'cols': args.cols, 'enemies': args.enemies, 'seed': args.seed, 'repeat': args.repeat},
+        'results': benchmarks.run(args.names),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['params'] != report['params']:
+            print(f"warning: baseline was run with {baseline['params']}")
+        if compare(report['results'], baseline, args.threshold):
+            sys.exit(1)
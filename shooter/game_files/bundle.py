@@ -0,0 +1,102 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+import pygame
+
+import assets
+import world
+from settings import *
+
+# asset bundle file: header (magic, version, index length), a json index of
+# [path, scale, flip, width, height, offset] entries, then every image's raw RGBA pixels
+BUNDLE_MAGIC = b'AST'
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<3sBI')
+
+
+def startup_keys():
+    # the (path, scale, flip) cache keys of the images the game loads before the menu and for its levels
+    keys = world.level_images(np.arange(TILE_TYPES))
+    keys += [('../images/icons/bullet.png', 1, False), ('../images/icons/grenade.png', 1, False)]
+    keys += [('../images/buttons/start_btn.png', 1, False), ('../images/buttons/exit_btn.png', 1, False),
+             ('../images/buttons/restart_btn.png', 2, False)]
+    keys += [(f'../images/background/{name}.png', 1, False) for name in ('sky_cloud', 'mountain', 'pine1')]
+    return keys
+
+
+def bake(path, keys):
+    # decodes and scales the images for keys and writes them to one bundle file, returns how many it wrote
+    decoded = {}
+    for key in keys:
+        assets.decode(key, decoded)
+    index = []
+    pixels = []
+    offset = 0
+    for key in keys:
+        img = decoded[key]
+        data = pygame.image.tobytes(img, 'RGBA')
+        source, scale, flip = key
+        index.append([source, scale, flip, img.get_width(), img.get_height(), offset])
+        pixels.append(data)
+        offset += len(data)
+    index = json.dumps(index).encode()
+    with open(path, 'wb') as f:
+        f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(index)))
+        f.write(index)
+        for data in pixels:
+            f.write(data)
+    return len(keys)
+
+
+def read_index(f):
+    magic, version, index_size = BUNDLE_HEADER.unpack(f.read(BUNDLE_HEADER.size))
+    if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+        raise ValueError(f'{f.name} is not a version {BUNDLE_VERSION} asset bundle')
+    return json.loads(f.read(index_size)), BUNDLE_HEADER.size + index_size
+
+
+def is_stale(path, index):
+    # a bundle is stale when any image it was baked from is missing or has changed since
+    bundle_time = os.path.getmtime(path)
+    for source in {entry[0] for entry in index}:
+        if not os.path.exists(source) or os.path.getmtime(source) > bundle_time:
+            return True
+    return False
+
+
+def load(path, cache=assets.cache):
+    # maps the bundle and puts its images in cache, returns how many it added. a missing or stale bundle
+    # adds nothing, so the images are loaded from the pngs as usual
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb') as f:
+        try:
+            index, start = read_index(f)
+        except (ValueError, struct.error) as e:
+            print(f'ignoring asset bundle: {e}')
+            return 0
+        if is_stale(path, index):
+            return 0
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    pixels = memoryview(mapped)[start:]
+    convert = pygame.display.get_surface() is not None  # converting needs a display mode
+    for source, scale, flip, width, height, offset in index:
+        img = pygame.image.frombuffer(pixels[offset:offset + width * height * 4], (width, height), 'RGBA')
+        if convert:
+            img = img.convert_alpha()
+        cache.store((source, tuple(scale) if isinstance(scale, list) else scale, flip), img)
+    cache.mapped = mapped  # unconverted images point into the file
+    return len(index)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bake the game\'s scaled images into one bundle file.')
+    parser.add_argument('--output', default=ASSET_BUNDLE_PATH)
+    args = parser.parse_args()
+
+    count = bake(args.output, startup_keys())
+    print(f'{count} images -> {args.output} ({os.path.getsize(args.output) // 1024} KB)')
@@ -0,0 +1,64 @@
+import pygame
+
+
+class Camera:
+    # sprites and tiles keep their world position, the camera offset is only applied when drawing
+    def __init__(self, width, height):
+        self.x = 0
+        self.last_x = 0  # x at the start of the current tick
+        self.alpha = 1.0  # how far between last_x and x frames are drawn from
+        self.width = width
+        self.height = height
+        self.level_width = width
+
+    def reset(self, level_width):
+        self.x = 0
+        self.last_x = 0
+        self.level_width = level_width
+
+    @property
+    def view(self):
+        # the part of the world that is on screen in the frame being drawn
+        return pygame.Rect(self.render_x, 0, self.width, self.height)
+
+    def follow(self, rect, dx, thresh):
+        # scroll along with rect once it gets within thresh of the edge of the screen
+        screen_left = rect.left - self.x
+        screen_right = rect.right - self.x
+        if (screen_right > self.width - thresh and self.x < self.level_width - self.width) \
+                or (screen_left < thresh and self.x > abs(dx)):
+            self.x += dx
+        # never show anything past either end of the level
+        self.x = max(0, min(self.x, self.level_width - self.width))
+
+    @property
+    def render_x(self):
+        # the camera position frames are drawn from, between the last two ticks
+        return round(self.last_x + (self.x - self.last_x) * self.alpha)
+
+    def screen_pos(self, sprite):
+        # where to draw a sprite, sprites that move keep their last_pos so they can be drawn between ticks
+        x, y = sprite.rect.topleft
+        last_pos = getattr(sprite, 'last_pos', None)
+        if last_pos is not None:
+            x = last_pos[0] + (x - last_pos[0]) * self.alpha
+            y = last_pos[1] + (y - last_pos[1]) * self.alpha
+        return round(x) - self.render_x, round(y)
+
+    def is_visible(self, rect):
+        return self.view.colliderect(rect)
+
+    def on_screen(self, pos, size):
+        # whether something of size drawn at screen position pos shows in the frame
+        x, y = pos
+        return x + size[0] > 0 and x < self.width and y + size[1] > 0 and y < self.height
+
+    def draw_group(self, queue, group, layer):
+        # like Group.draw but offset by the camera and skipping sprites that are off screen,
+        # submits them to a renderer.RenderQueue. sprites are culled where they are drawn, between ticks
+        items = []
+        for sprite in group:
+            pos = self.screen_pos(sprite)
+            if self.on_screen(pos, sprite.rect.size):
+                items.append((sprite.image, pos))
+        queue.submit_many(items, layer)
@@ -0,0 +1,73 @@
+import pygame
+
+from settings import *
+
+
+class TextCache:
+    # keeps rendered text around since the same labels are drawn every frame
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self.surfaces = {}
+
+    def render(self, text, font, color):
+        key = (text, font, color)
+        img = self.surfaces.get(key)
+        if img is None:
+            if len(self.surfaces) >= self.capacity:
+                self.surfaces.clear()
+            img = font.render(text, True, color)
+            self.surfaces[key] = img
+        return img
+
+
+text_cache = TextCache()
+
+
+class HealthBar:
+    def __init__(self, x, y, health, max_health):
+        self.x = x
+        self.y = y
+        self.health = health
+        self.max_health = max_health
+
+    def draw(self, surface, health):
+        # update w/ new health
+        self.health = health
+        ratio = self.health / self.max_health
+        pygame.draw.rect(surface, BLACK, (self.x - 2, self.y - 2, 154, 24))
+        pygame.draw.rect(surface, RED, (self.x, self.y, 150, 20))
+        pygame.draw.rect(surface, GREEN, (self.x, self.y, 150 * ratio, 20))
+
+
+class Hud:
+    # the player stats are composed onto one surface that is only redrawn when a stat changes
+    def __init__(self, font, bullet_img, grenade_img, width=SCREEN_WIDTH, height=110):
+        self.health_bar = HealthBar(10, 10, 100, 100)
+        self.font = font
+        self.bullet_img = bullet_img
+        self.grenade_img = grenade_img
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.stats = None  # the (health, max health, ammo, grenades) currently drawn on self.surface
+        self.redraws = 0
+
+    def render(self, health, max_health, ammo, grenades):
+        self.surface.fill((0, 0, 0, 0))
+        self.health_bar.max_health = max_health
+        self.health_bar.draw(self.surface, health)
+        self.surface.blit(text_cache.render('AMMO: ', self.font, WHITE), (10, 35))
+        for x in range(ammo):
+            self.surface.blit(self.bullet_img, (135 + (x * 10), 50))
+        self.surface.blit(text_cache.render('GRENADES: ', self.font, WHITE), (10, 75))
+        for x in range(grenades):
+            self.surface.blit(self.grenade_img, (200 + (x * 15), 90))
+        self.redraws += 1
+
+    def draw_stats(self, surface, stats):
+        # draws (health, max health, ammo, grenades), returns the HUD area if it was redrawn,
+        # None if it looks the same as last frame
+        changed = stats != self.stats
+        if changed:
+            self.render(*stats)
+            self.stats = stats
+        rect = surface.blit(self.surface, (0, 0))
+        return rect if changed else None
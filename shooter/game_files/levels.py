@@ -0,0 +1,138 @@
+import argparse
+import csv
+import os
+import queue
+import struct
+import threading
+
+import numpy as np
+
+import assets
+import world
+from settings import *
+
+# compiled level file: header (magic, version, rows, columns) followed by one int8 per tile, row by row
+LEVEL_MAGIC = b'LVL'
+LEVEL_VERSION = 1
+LEVEL_HEADER = struct.Struct('<3sBHH')
+
+_cache = {}  # level number -> tile grid, so restarting a level doesn't touch the disk
+
+
+def csv_path(level):
+    return LEVEL_PATH.format(level)
+
+
+def compiled_path(level):
+    return os.path.splitext(LEVEL_PATH.format(level))[0] + '.lvl'
+
+
+def parse_csv(path):
+    # the grid is as big as the file, short rows are padded with empty tiles (-1)
+    with open(path, newline='') as csvfile:
+        rows = [[int(tile) for tile in row] for row in csv.reader(csvfile, delimiter=',') if row]
+    grid = np.full((len(rows), max(len(row) for row in rows)), -1, dtype=np.int8)
+    for y, row in enumerate(rows):
+        grid[y, :len(row)] = row
+    return grid
+
+
+def write_compiled(path, grid):
+    rows, cols = grid.shape
+    with open(path, 'wb') as f:
+        f.write(LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, rows, cols))
+        f.write(np.ascontiguousarray(grid, dtype=np.int8).tobytes())
+
+
+def read_compiled(path):
+    # maps the file straight into a read only array, there is nothing to parse
+    with open(path, 'rb') as f:
+        magic, version, rows, cols = LEVEL_HEADER.unpack(f.read(LEVEL_HEADER.size))
+    if magic != LEVEL_MAGIC or version != LEVEL_VERSION:
+        raise ValueError(f'{path} is not a version {LEVEL_VERSION} level file')
+    return np.memmap(path, dtype=np.int8, mode='r', offset=LEVEL_HEADER.size, shape=(rows, cols))
+
+
+def compile_level(level):
+    grid = parse_csv(csv_path(level))
+    write_compiled(compiled_path(level), grid)
+    return grid
+
+
+def load_level(level):
+    # returns the level's tiles as a (rows, columns) int8 array.
+    # the compiled file is used when it is newer than the csv, otherwise the csv is parsed and compiled
+    grid = _cache.get(level)
+    if grid is not None:
+        return grid
+
+    source = csv_path(level)
+    compiled = compiled_path(level)
+    if os.path.exists(compiled) and (not os.path.exists(source)
+                                     or os.path.getmtime(compiled) >= os.path.getmtime(source)):
+        grid = read_compiled(compiled)
+    else:
+        grid = parse_csv(source)
+        try:
+            write_compiled(compiled, grid)
+        except OSError:
+            pass  # can't write next to the csv, it will just be parsed again next run
+    _cache[level] = grid
+    return grid
+
+
+def clear_cache():
+    _cache.clear()
+
+
+class Preloader:
+    # gets the next level ready while the current one is played. a worker thread reads the tiles and decodes
+    # and scales the level's images, poll() converts them and builds the World on the main thread
+    # (converting needs the display), so moving to the level is just swapping it in
+    def __init__(self):
+        self.requests = queue.Queue()
+        self.results = queue.Queue()  # (level, tiles, decoded images) from the worker
+        self.prepared = {}  # level -> (World, player) ready to be swapped in
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def request(self, level):
+        if 1 <= level <= MAX_LEVELS and level not in self.prepared:
+            self.requests.put(level)
+
+    def work(self):
+        while True:
+            level = self.requests.get()
+            try:
+                tiles = np.array(load_level(level))  # a copy, so the mapped file is read here and not mid frame
+                decoded = {}
+                for key in world.level_images(tiles):
+                    if key not in assets.cache:
+                        assets.decode(key, decoded)
+            except (OSError, ValueError) as e:
+                print(f'could not preload level {level}: {e}')
+                continue
+            self.results.put((level, tiles, decoded))
+
+    def poll(self):
+        # call once a frame, finishes any level the worker is done with
+        while not self.results.empty():
+            level, tiles, decoded = self.results.get()
+            assets.cache.add(decoded)
+            level_world = world.World()
+            self.prepared[level] = (level_world, level_world.process_data(tiles))
+
+    def take(self, level):
+        # the World and player of a prepared level, or None if poll() hasn't finished it yet. each is only
+        # handed out once, they carry the level's progress. doesn't touch pygame, so any thread can call it
+        return self.prepared.pop(level, None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile level csv files into the binary .lvl format.')
+    parser.add_argument('levels', nargs='*', type=int, help='level numbers to compile (default: all)')
+    args = parser.parse_args()
+
+    for level in args.levels or range(1, MAX_LEVELS + 1):
+        grid = compile_level(level)
+        print(f'{csv_path(level)} -> {compiled_path(level)} ({grid.shape[0]} x {grid.shape[1]})')
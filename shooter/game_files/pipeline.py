@@ -0,0 +1,62 @@
+import threading
+import time
+
+import renderer
+import simulation
+
+
+class Snapshot:
+    # everything the main thread needs to draw one tick, made on the simulation thread and not changed after
+    __slots__ = ('ticks', 'level', 'camera_x', 'layers', 'hud_stats', 'player_alive')
+
+    def __init__(self, state, queue):
+        camera = state.camera
+        camera.alpha = 1.0  # snapshots are drawn at the tick they were taken, not between ticks
+        renderer.submit_state(queue, state)
+        self.layers = queue.take()
+        self.camera_x = camera.render_x
+        player = state.player
+        self.hud_stats = (player.health, player.max_health, player.ammo, player.grenades)
+        self.player_alive = player.alive
+        self.ticks = state.ticks
+        self.level = state.level
+
+
+class Pipeline:
+    # runs the simulation on its own thread at TICK_RATE. after each batch of ticks it publishes a new
+    # Snapshot, so the main thread draws the last tick while the next one is simulated. pygame's blits
+    # let go of the GIL, so the two really do overlap
+    def __init__(self, state, tick):
+        self.state = state
+        self.tick = tick  # steps the state by one tick
+        self.lock = threading.Lock()  # held while ticking, take it to change the state from another thread
+        self.queue = renderer.RenderQueue()
+        self.snapshot = None  # the latest published Snapshot, swapped in whole
+        self.running = False
+        self.thread = None
+
+    def publish(self):
+        # call with the lock held
+        self.snapshot = Snapshot(self.state, self.queue)
+
+    def start(self):
+        with self.lock:
+            self.publish()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        tick_clock = simulation.TickClock()
+        while self.running:
+            tick_clock.advance()
+            with self.lock:
+                if tick_clock.run(self.tick):
+                    self.publish()
+            time.sleep(max(tick_clock.tick_time - tick_clock.accumulator, 0))
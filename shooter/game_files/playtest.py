@@ -0,0 +1,197 @@
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import levels
+import simulation
+from settings import *
+
+
+class RandomBot:
+    # holds random keys for a random number of ticks, leaning towards moving right
+    def __init__(self, rng):
+        self.rng = rng
+        self.hold = 0
+
+    def __call__(self, state, controls):
+        rng = self.rng
+        if self.hold <= 0:
+            self.hold = rng.randint(5, 40)
+            direction = rng.random()
+            controls.moving_right = direction < 0.6
+            controls.moving_left = 0.6 <= direction < 0.8
+            controls.shoot = rng.random() < 0.3
+            controls.grenade = rng.random() < 0.05
+        self.hold -= 1
+        controls.jump = rng.random() < 0.05
+
+
+class RunnerBot:
+    # runs right, jumps when it gets stuck or reaches the edge of the ground, stops to shoot enemies in front of it
+    def __init__(self, rng):
+        self.rng = rng
+        self.last_x = None
+        self.stuck = 0  # ticks in a row it has tried to move right and not moved
+        self.world = None
+        self.safe = None
+
+    def find_safe(self, state):
+        # safe[row, col] is True when dropping down column col from row lands on a tile rather than in water
+        # or off the bottom of the map
+        solid = state.world.solid
+        water = (state.world.data >= 9) & (state.world.data <= 10)
+        safe = np.zeros_like(solid)
+        below = np.zeros(solid.shape[1], dtype=bool)
+        for row in range(solid.shape[0] - 1, -1, -1):
+            below = np.where(solid[row], True, np.where(water[row], False, below))
+            safe[row] = below
+        self.world = state.world
+        self.safe = safe
+
+    def __call__(self, state, controls):
+        if self.world is not state.world:
+            self.find_safe(state)
+        player = state.player
+        safe = self.safe
+        rows, cols = safe.shape
+        col = min((player.rect.right + TILE_SIZE // 2) // TILE_SIZE, cols - 1)
+        row = min(player.rect.bottom // TILE_SIZE, rows - 1)
+        edge = not state.world.solid[row, col]
+        # when falling, stop over safe ground rather than carry on over a gap
+        over_safe = safe[row, min(player.rect.centerx // TILE_SIZE, cols - 1)]
+        controls.moving_right = not (player.in_air and player.vel_y > 0 and over_safe and not safe[row, col])
+        controls.moving_left = False
+        # only ask to jump from the ground, a jump asked for in the air happens as soon as it lands
+        self.stuck = self.stuck + 1 if player.rect.x == self.last_x else 0
+        controls.jump = not player.in_air and (edge or self.stuck > 1)
+        self.last_x = player.rect.x if controls.moving_right else None
+        in_front = False
+        for enemy in state.active_enemies:
+            dx = (enemy.rect.centerx - player.rect.centerx) * player.direction
+            if enemy.alive and 0 < dx < TILE_SIZE * 6 and abs(enemy.rect.centery - player.rect.centery) < TILE_SIZE:
+                in_front = True
+        controls.shoot = in_front and player.ammo > 0
+        if controls.shoot:
+            controls.moving_right = False  # stand and fight
+            self.last_x = None
+        controls.grenade = in_front and player.ammo == 0 and not state.grenade_thrown
+
+
+BOTS = {'random': RandomBot, 'runner': RunnerBot}
+
+
+def run_episode(task):
+    # plays one level to the exit, the player's death or max_ticks and returns what happened
+    level, seed, bot_name, max_ticks = task
+    state = simulation.GameState(level, seed)
+    controls = simulation.Controls()
+    bot = BOTS[bot_name](random.Random(seed))
+    player = state.player
+    damage_taken = ammo_used = grenades_used = 0
+    for _ in range(max_ticks):
+        health, ammo, grenades = player.health, player.ammo, player.grenades
+        bot(state, controls)
+        simulation.step(state, controls)
+        # pickups only ever add, so any drop is damage or something being used
+        damage_taken += max(health - player.health, 0)
+        ammo_used += max(ammo - player.ammo, 0)
+        grenades_used += max(grenades - player.grenades, 0)
+        if state.level_complete or not player.alive:
+            break
+    return {
+        'level': level,
+        'seed': seed,
+        'bot': bot_name,
+        'completed': state.level_complete,
+        'died': not player.alive,
+        'ticks': state.ticks,
+        'time_to_exit': state.ticks / TICK_RATE if state.level_complete else None,
+        'damage_taken': damage_taken,
+        'ammo_used': ammo_used,
+        'grenades_used': grenades_used,
+        'enemies_killed': sum(1 for enemy in state.world.enemies(state) if not enemy.alive),
+    }
+
+
+def mean(values):
+    return statistics.fmean(values) if values else None
+
+
+def summarize(results):
+    # aggregate stats per level
+    summary = []
+    for level in sorted({result['level'] for result in results}):
+        episodes = [result for result in results if result['level'] == level]
+        exit_times = [result['time_to_exit'] for result in episodes if result['completed']]
+        summary.append({
+            'level': level,
+            'episodes': len(episodes),
+            'completion_rate': sum(result['completed'] for result in episodes) / len(episodes),
+            'death_rate': sum(result['died'] for result in episodes) / len(episodes),
+            'mean_time_to_exit': mean(exit_times),
+            'median_time_to_exit': statistics.median(exit_times) if exit_times else None,
+            'mean_damage_taken': mean([result['damage_taken'] for result in episodes]),
+            'mean_ammo_used': mean([result['ammo_used'] for result in episodes]),
+            'mean_grenades_used': mean([result['grenades_used'] for result in episodes]),
+            'mean_enemies_killed': mean([result['enemies_killed'] for result in episodes]),
+        })
+    return summary
+
+
+def run_playtest(level_numbers, episodes, bot, seed=0, max_ticks=TICK_RATE * 120, workers=None):
+    # episode i of every level uses seed + i, so a batch can be rerun exactly
+    for level in level_numbers:
+        levels.load_level(level)  # compile the levels once here rather than racing to in every worker
+    tasks = [(level, seed + i, bot, max_ticks) for level in level_numbers for i in range(episodes)]
+    with ProcessPoolExecutor(workers, initializer=simulation.init_headless) as executor:
+        chunksize = max(len(tasks) // ((workers or os.cpu_count() or 1) * 4), 1)
+        return list(executor.map(run_episode, tasks, chunksize=chunksize))
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play levels many times with bots and report balance stats.')
+    parser.add_argument('--levels', nargs='+', type=int, default=list(range(1, MAX_LEVELS + 1)))
+    parser.add_argument('--episodes', type=int, default=100, help='episodes per level')
+    parser.add_argument('--bot', choices=sorted(BOTS), default='runner')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first episode')
+    parser.add_argument('--max-ticks', type=int, default=TICK_RATE * 120, help='ticks before an episode gives up')
+    parser.add_argument('--workers', type=int, default=None, help='processes to use (default: one per cpu)')
+    parser.add_argument('--json', help='write the summary and every episode to this file')
+    parser.add_argument('--csv', help='write the per level summary to this file')
+    parser.add_argument('--episodes-csv', help='write one row per episode to this file')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_playtest(args.levels, args.episodes, args.bot, args.seed, args.max_ticks, args.workers)
+    elapsed = time.perf_counter() - start
+    summary = summarize(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'bot': args.bot, 'seed': args.seed, 'summary': summary, 'episodes': results}, f, indent=2)
+    if args.csv:
+        write_csv(args.csv, summary)
+    if args.episodes_csv:
+        write_csv(args.episodes_csv, results)
+
+    ticks = sum(result['ticks'] for result in results)
+    print(f'{len(results)} episodes, {ticks} ticks in {elapsed:.2f}s ({ticks / elapsed:.0f} ticks/s)')
+    for row in summary:
+        line = f"level {row['level']}: {row['completion_rate']:.0%} completed, {row['death_rate']:.0%} died"
+        if row['mean_time_to_exit'] is not None:
+            line += f", mean time to exit {row['mean_time_to_exit']:.1f}s"
+        print(line)
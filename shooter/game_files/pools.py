@@ -0,0 +1,46 @@
+import pygame
+
+
+class Pool:
+    # keeps killed sprites so they can be reset and used again instead of making new ones
+    def __init__(self, sprite_type, capacity):
+        self.sprite_type = sprite_type  # class to make when the pool is empty, needs a reset() taking the same args
+        self.capacity = capacity  # most killed sprites kept, any more are left for the garbage collector
+        self.free = []
+        self.hits = 0  # sprites handed out from the pool
+        self.misses = 0  # sprites that had to be made
+
+    def acquire(self, *args):
+        if self.free:
+            self.hits += 1
+            sprite = self.free.pop()
+            sprite.pooled = False
+            sprite.reset(*args)
+        else:
+            self.misses += 1
+            sprite = self.sprite_type(*args)
+            sprite.pool = self
+        return sprite
+
+    def release(self, sprite):
+        if sprite.pooled:  # killed twice, it is already in the pool
+            return
+        if len(self.free) < self.capacity:
+            sprite.pooled = True
+            self.free.append(sprite)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'free': len(self.free)}
+
+
+class PooledSprite(pygame.sprite.Sprite):
+    # a sprite that goes back to the Pool it came from when it is killed
+    def __init__(self):
+        pygame.sprite.Sprite.__init__(self)
+        self.pool = None
+        self.pooled = False
+
+    def kill(self):
+        pygame.sprite.Sprite.kill(self)
+        if self.pool is not None:
+            self.pool.release(self)
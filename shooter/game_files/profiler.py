@@ -0,0 +1,124 @@
+import json
+import time
+from collections import deque
+
+import pygame
+
+from settings import *
+
+
+class Span:
+    # times one stage and hands the result to the profiler when the with block ends
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+
+
+class NullSpan:
+    # what span() hands out while the profiler is off, so a disabled span is one method call
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Profiler:
+    # times the stages of each frame for the overlay and, while tracing, records them as chrome trace events
+    def __init__(self, enabled=False, history=600, max_events=500000):
+        self.enabled = enabled
+        self.tracing = False
+        self.frame_times = deque(maxlen=history)  # ms between the starts of the last `history` frames
+        self.stage_times = {}  # stage name -> ms spent in it this frame
+        self.last_stage_times = {}  # the same for the last finished frame
+        self.frame_start = None
+        self.events = []
+        self.max_events = max_events  # tracing stops recording after this many to bound memory
+        self.epoch = time.perf_counter()
+        self.overlay = None
+        self.overlay_frames = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.frame_start = None
+        self.frame_times.clear()
+
+    def span(self, name):
+        if self.enabled:
+            return Span(self, name)
+        return NULL_SPAN
+
+    def record(self, name, start, end):
+        self.stage_times[name] = self.stage_times.get(name, 0) + (end - start) * 1000
+        if self.tracing and len(self.events) < self.max_events:
+            self.events.append({'name': name, 'ph': 'X', 'pid': 1, 'tid': 1,
+                                'ts': (start - self.epoch) * 1e6, 'dur': (end - start) * 1e6})
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.frame_times.append((now - self.frame_start) * 1000)
+            self.record('frame', self.frame_start, now)
+        self.frame_start = now
+        self.last_stage_times = self.stage_times
+        self.stage_times = {}
+
+    def percentile(self, p):
+        times = sorted(self.frame_times)
+        if not times:
+            return 0
+        return times[min(int(len(times) * p / 100), len(times) - 1)]
+
+    def fps(self):
+        if not self.frame_times:
+            return 0
+        return 1000 * len(self.frame_times) / sum(self.frame_times)
+
+    def start_trace(self):
+        self.events = []
+        self.tracing = True
+        self.enabled = True  # spans only record while the profiler is on
+
+    def stop_trace(self, path):
+        # writes the recorded events in chrome://tracing (trace event) format
+        self.tracing = False
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+        self.events = []
+        return path
+
+    def draw_overlay(self, surface, font, counts, refresh=15):
+        # the text is rebuilt every `refresh` frames so it can be read, returns the area drawn to
+        if not self.enabled:
+            return None
+        self.overlay_frames -= 1
+        if self.overlay is None or self.overlay_frames <= 0:
+            self.overlay_frames = refresh
+            lines = [f'FPS {self.fps():.0f}  p50 {self.percentile(50):.1f}ms  p99 {self.percentile(99):.1f}ms'
+                     + ('  TRACING' if self.tracing else '')]
+            lines += [f'{name} {ms:.2f}ms' for name, ms in self.last_stage_times.items()]
+            lines.append('  '.join(f'{name} {count}' for name, count in counts.items()))
+            images = [font.render(line, True, WHITE) for line in lines]
+            width = max(image.get_width() for image in images) + 10
+            height = sum(image.get_height() for image in images) + 10
+            self.overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 160))
+            y = 5
+            for image in images:
+                self.overlay.blit(image, (5, y))
+                y += image.get_height()
+        return surface.blit(self.overlay, (surface.get_width() - self.overlay.get_width() - 5, 5))
@@ -0,0 +1,210 @@
+import numpy as np
+
+import assets
+from renderer import LAYER_PROJECTILES
+from sprites import soldiers_near
+from settings import *
+
+BULLET = 0
+GRENADE = 1
+BULLET_SPEED = 10
+GRENADE_SPEED = 7
+GRENADE_TIMER = 100
+
+
+def to_pixels(values):
+    # rounds half away from zero like assigning a float to a pygame Rect does
+    values = np.asarray(values, dtype=np.float64)
+    return np.trunc(values + np.copysign(0.5, values)).astype(np.int32)
+
+
+class ProjectileSystem:
+    # bullets and grenades stored as numpy arrays (one entry per projectile) and moved all at once,
+    # instead of one Bullet/Grenade sprite each. follows the same rules as the sprites in sprites.py
+    ARRAYS = ('kind', 'x', 'y', 'last_x', 'last_y', 'direction', 'speed', 'vel_y', 'timer', 'alive')
+
+    def __init__(self, capacity=256):
+        self.images = [assets.cache.get('../images/icons/bullet.png'), assets.cache.get('../images/icons/grenade.png')]
+        self.sizes = np.array([img.get_size() for img in self.images], dtype=np.int32)
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.x = np.zeros(capacity, dtype=np.int32)  # top left of the projectile's rect
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.last_x = np.zeros(capacity, dtype=np.int32)  # position at the start of the tick
+        self.last_y = np.zeros(capacity, dtype=np.int32)
+        self.direction = np.zeros(capacity, dtype=np.int32)
+        self.speed = np.zeros(capacity, dtype=np.int32)
+        self.vel_y = np.zeros(capacity, dtype=np.float64)
+        self.timer = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def grow(self):
+        old = {name: getattr(self, name) for name in self.ARRAYS}
+        self.allocate(len(self.kind) * 2)
+        for name, array in old.items():
+            getattr(self, name)[:self.count] = array[:self.count]
+
+    def spawn(self, kind, centerx, centery, direction, speed, vel_y, timer):
+        if self.count == len(self.kind):
+            self.grow()
+        i = self.count
+        width, height = self.sizes[kind]
+        self.kind[i] = kind
+        self.x[i] = self.last_x[i] = to_pixels(centerx) - width // 2
+        self.y[i] = self.last_y[i] = to_pixels(centery) - height // 2
+        self.direction[i] = direction
+        self.speed[i] = speed
+        self.vel_y[i] = vel_y
+        self.timer[i] = timer
+        self.alive[i] = True
+        self.count += 1
+
+    def spawn_bullet(self, x, y, direction):
+        self.spawn(BULLET, x, y, direction, BULLET_SPEED, 0, 0)
+
+    def spawn_grenade(self, x, y, direction):
+        self.spawn(GRENADE, x, y, direction, GRENADE_SPEED, -11, GRENADE_TIMER)
+
+    def clear(self):
+        self.count = 0
+
+    def count_kind(self, kind):
+        return int(np.count_nonzero(self.kind[:self.count] == kind))
+
+    def save_positions(self):
+        n = self.count
+        self.last_x[:n] = self.x[:n]
+        self.last_y[:n] = self.y[:n]
+
+    def compact(self):
+        # drops dead projectiles, keeping the rest in the order they were fired
+        n = self.count
+        keep = np.flatnonzero(self.alive[:n])
+        if len(keep) == n:
+            return
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        self.count = len(keep)
+
+    def hits_solid(self, solid, left, top, width, height):
+        # True where the rect overlaps a solid tile. projectiles are smaller than a tile
+        # so the rect can only touch the cells at its corners
+        rows, cols = solid.shape
+        first_col = left // TILE_SIZE
+        last_col = (left + width - 1) // TILE_SIZE
+        first_row = top // TILE_SIZE
+        last_row = (top + height - 1) // TILE_SIZE
+        hit = np.zeros(len(left), dtype=bool)
+        for col in (first_col, last_col):
+            for row in (first_row, last_row):
+                inside = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+                hit[inside] |= solid[row[inside], col[inside]]
+        return hit
+
+    def update_bullets(self, state):
+        n = self.count
+        bullets = np.flatnonzero(self.alive[:n] & (self.kind[:n] == BULLET))
+        if len(bullets) == 0:
+            return
+        width, height = self.sizes[BULLET]
+        # moves bullets
+        x = self.x[bullets] + self.direction[bullets] * self.speed[bullets]
+        y = self.y[bullets]
+        self.x[bullets] = x
+        # check if bullets leave the screen or hit a tile
+        camera_x = state.camera.x
+        dead = (x + width < camera_x) | (x > camera_x + SCREEN_WIDTH)
+        dead |= self.hits_solid(state.world.solid, x, y, width, height)
+
+        # each bullet can hit one living soldier, the player is checked first
+        soldiers = [state.player] if state.player.alive else []
+        soldiers += [bad_guy for bad_guy in state.enemy_group if bad_guy.alive]
+        live = ~dead
+        if live.any():
+            min_x, max_x = x[live].min(), x[live].max() + width
+            for soldier in soldiers:
+                rect = soldier.rect
+                if rect.right <= min_x or rect.left >= max_x:
+                    continue
+                hit = live & (x < rect.right) & (x + width > rect.left) & (y < rect.bottom) & (y + height > rect.top)
+                hits = int(np.count_nonzero(hit))
+                if hits:
+                    soldier.health -= hits * (5 if soldier is state.player else 25)
+                    live &= ~hit
+                    dead |= hit
+        self.alive[bullets[dead]] = False
+        self.compact()
+
+    def update_grenades(self, state):
+        n = self.count
+        grenades = np.flatnonzero(self.alive[:n] & (self.kind[:n] == GRENADE))
+        if len(grenades) == 0:
+            return
+        width, height = self.sizes[GRENADE]
+        solid = state.world.solid
+        x = self.x[grenades]
+        y = self.y[grenades]
+        direction = self.direction[grenades]
+        speed = self.speed[grenades]
+        vel_y = self.vel_y[grenades] + GRAVITY
+        dx = direction * speed
+        dy = vel_y.copy()
+
+        # bounce off tiles
+        bounce = self.hits_solid(solid, x + dx, y, width, height)
+        direction[bounce] *= -1
+        dx = direction * speed
+        # land on (or hit the underside of) tiles
+        moved_y = np.trunc(y + dy).astype(np.int32)  # Rect.colliderect drops the fraction
+        landed = self.hits_solid(solid, x, moved_y, width, height)
+        speed[landed] = 0
+        rising = landed & (vel_y < 0)
+        falling = landed & (vel_y >= 0)
+        # thrown up: stop under the tile, falling: stop on top of the tile
+        dy[rising] = (moved_y[rising] // TILE_SIZE + 1) * TILE_SIZE - y[rising]
+        dy[falling] = ((moved_y[falling] + height - 1) // TILE_SIZE) * TILE_SIZE - (y[falling] + height)
+        vel_y[landed] = 0
+
+        # bounce off the edges of the screen
+        camera_x = state.camera.x
+        wall = (x + dx < camera_x) | (x + width + dx > camera_x + SCREEN_WIDTH)
+        direction[wall] *= -1
+        dx = np.where(wall, direction * speed, dx)
+
+        # update position
+        self.x[grenades] = x + dx
+        self.y[grenades] = to_pixels(y + dy)
+        self.direction[grenades] = direction
+        self.speed[grenades] = speed
+        self.vel_y[grenades] = vel_y
+
+        # countdown timer
+        self.timer[grenades] -= 1
+        exploded = grenades[self.timer[grenades] <= 0]
+        if len(exploded):
+            for i in exploded:
+                x, y = int(self.x[i]), int(self.y[i])
+                state.explosion_group.add(state.explosion_pool.acquire(x, y, 2))
+                # damage nearby Soldiers
+                for soldier in soldiers_near(state, x + width // 2, y + height // 2, TILE_SIZE * 2):
+                    soldier.health -= 50
+            self.alive[exploded] = False
+            self.compact()
+
+    def draw(self, queue, camera):
+        # submits every projectile on screen to a renderer.RenderQueue
+        n = self.count
+        if n == 0:
+            return
+        alpha = camera.alpha
+        x = np.round(self.last_x[:n] + (self.x[:n] - self.last_x[:n]) * alpha).astype(np.int32) - camera.render_x
+        y = np.round(self.last_y[:n] + (self.y[:n] - self.last_y[:n]) * alpha).astype(np.int32)
+        width = self.sizes[self.kind[:n], 0]
+        visible = np.flatnonzero((x + width > 0) & (x < camera.width))
+        images = self.images
+        kind = self.kind
+        queue.submit_many([(images[kind[i]], (int(x[i]), int(y[i]))) for i in visible], LAYER_PROJECTILES)
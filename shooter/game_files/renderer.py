@@ -0,0 +1,104 @@
+import pygame
+
+# render queue layers, drawn back to front
+LAYER_WORLD = 0
+LAYER_ITEMS = 1  # item boxes and the exit
+LAYER_SOLDIERS = 2
+LAYER_PLAYER = 3  # the player is always in front of enemies
+LAYER_PROJECTILES = 4
+LAYER_WATER = 5  # over anything standing in it
+LAYER_EFFECTS = 6
+NUM_LAYERS = 7
+
+
+class RenderQueue:
+    # things to draw this frame are submitted as (surface, position) on a layer and all drawn by flush(),
+    # one blits call per layer, so the order only depends on the layers and not on who draws first
+    def __init__(self, layers=NUM_LAYERS, untracked=(LAYER_WORLD,)):
+        self.layers = [[] for _ in range(layers)]
+        self.untracked = set(untracked)  # layers whose areas flush() doesn't return, they only change with the camera
+
+    def submit(self, surface, pos, layer):
+        self.layers[layer].append((surface, pos))
+
+    def submit_many(self, entries, layer):
+        self.layers[layer].extend(entries)
+
+    def clear(self):
+        for entries in self.layers:
+            entries.clear()
+
+    def take(self):
+        # hands over everything submitted so far and starts the queue empty, for drawing somewhere else
+        layers = self.layers
+        self.layers = [[] for _ in layers]
+        return layers
+
+    def flush(self, target, rects=True, layers=None):
+        # draws and empties the queue (or layers from take()), returns the areas drawn to
+        # (only when rects is True, fblits is used otherwise where pygame has it)
+        drawn = []
+        has_fblits = hasattr(target, 'fblits')
+        for layer, entries in enumerate(self.layers if layers is None else layers):
+            if entries:
+                if not rects or layer in self.untracked:
+                    if has_fblits:
+                        target.fblits(entries)
+                    else:
+                        target.blits(entries, False)
+                else:
+                    drawn.extend(target.blits(entries))
+        if layers is None:
+            self.clear()
+        return drawn
+
+
+def submit_state(queue, state):
+    # submits everything in the game world for this frame
+    camera = state.camera
+    state.world.draw(queue, camera)
+    state.player.draw(queue, camera)
+    for enemy in state.active_enemies:  # the others are too far away to be on screen
+        enemy.draw(queue, camera)
+    camera.draw_group(queue, state.item_box_group, LAYER_ITEMS)
+    camera.draw_group(queue, state.exit_group, LAYER_ITEMS)
+    camera.draw_group(queue, state.bullet_group, LAYER_PROJECTILES)
+    camera.draw_group(queue, state.grenade_group, LAYER_PROJECTILES)
+    if state.projectiles is not None:
+        state.projectiles.draw(queue, camera)
+    camera.draw_group(queue, state.water_group, LAYER_WATER)
+    camera.draw_group(queue, state.explosion_group, LAYER_EFFECTS)
+
+
+class DirtyRects:
+    # collects the parts of the screen that changed this frame so only those are sent to the display.
+    # the whole frame is still drawn to the screen surface, this only cuts down what gets presented
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.rects = []
+        self.last_rects = []  # what was drawn last frame has to be refreshed too so it gets erased
+        self.full = True  # the first frame always goes out in full
+
+    def add(self, rect):
+        if rect:
+            self.rects.append(pygame.Rect(rect))
+
+    def extend(self, rects):
+        for rect in rects:
+            self.add(rect)
+
+    def invalidate(self):
+        # the next present pushes the whole screen, e.g. when the camera scrolls or the screen fades
+        self.full = True
+
+    def present(self):
+        if not self.enabled:
+            pygame.display.update()
+        elif self.full:
+            pygame.display.update()
+            self.rects = [pygame.display.get_surface().get_rect()]
+        else:
+            pygame.display.update(self.last_rects + self.rects)
+        self.last_rects = self.rects
+        self.rects = []
+        self.full = False
@@ -0,0 +1,161 @@
+import argparse
+import hashlib
+import struct
+import sys
+import time
+
+import pygame
+
+import renderer
+import simulation
+import sprites
+from settings import *
+
+# replay file: header (magic, version, seed, level, flags, ticks), the digest of the final state,
+# then the controls of every tick as runs of (control bits, ticks)
+REPLAY_MAGIC = b'RPL'
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct('<3sBIBBI20s')
+REPLAY_RUN = struct.Struct('<BH')
+
+# control bits
+MOVING_LEFT = 1
+MOVING_RIGHT = 2
+SHOOT = 4
+GRENADE = 8
+JUMP = 16
+RESTART = 32  # the level was restarted just before this tick
+
+# flags
+ARRAY_PROJECTILES_FLAG = 1
+RESTARTED_FLAG = 2  # the level was restarted after the last tick
+
+
+def control_bits(controls):
+    return (MOVING_LEFT * controls.moving_left | MOVING_RIGHT * controls.moving_right | SHOOT * controls.shoot
+            | GRENADE * controls.grenade | JUMP * controls.jump)
+
+
+def set_controls(controls, bits):
+    controls.moving_left = bool(bits & MOVING_LEFT)
+    controls.moving_right = bool(bits & MOVING_RIGHT)
+    controls.shoot = bool(bits & SHOOT)
+    controls.grenade = bool(bits & GRENADE)
+    controls.jump = bool(bits & JUMP)
+
+
+def state_digest(state):
+    # sha1 of everything a replay should reproduce, so a run can be checked against the recording
+    player = state.player
+    enemies = [(enemy.rect.topleft, enemy.health, enemy.alive) for enemy in state.world.enemies(state)]
+    parts = (state.level, state.ticks, player.rect.topleft, player.health, player.ammo, player.grenades,
+             player.alive, sorted(enemies), len(state.item_box_group), len(state.world.removed),
+             state.rng.getstate())
+    return hashlib.sha1(repr(parts).encode()).digest()
+
+
+class Recorder:
+    # logs the controls of every tick of a game so it can be replayed exactly
+    def __init__(self, state):
+        self.seed = state.seed
+        self.level = state.level
+        self.flags = ARRAY_PROJECTILES_FLAG if state.projectiles is not None else 0
+        self.ticks = []  # control bits per tick
+        self.restarting = False
+
+    def restart(self):
+        # call when the level is restarted, it happens again before the next recorded tick
+        self.restarting = True
+
+    def record(self, controls):
+        # call with the controls each tick is stepped with
+        self.ticks.append(control_bits(controls) | RESTART * self.restarting)
+        self.restarting = False
+
+    def save(self, path, state):
+        if self.restarting:
+            self.flags |= RESTARTED_FLAG
+        runs = []
+        for bits in self.ticks:
+            if runs and runs[-1][0] == bits and runs[-1][1] < 0xffff:
+                runs[-1][1] += 1
+            else:
+                runs.append([bits, 1])
+        with open(path, 'wb') as f:
+            f.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.level, self.flags,
+                                       len(self.ticks), state_digest(state)))
+            for bits, count in runs:
+                f.write(REPLAY_RUN.pack(bits, count))
+        return path
+
+
+class Replay:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, self.seed, self.level, self.flags, count, self.digest = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f'{path} is not a version {REPLAY_VERSION} replay')
+        self.ticks = []
+        for bits, run in REPLAY_RUN.iter_unpack(data[REPLAY_HEADER.size:]):
+            self.ticks.extend([bits] * run)
+        if len(self.ticks) != count:
+            raise ValueError(f'{path} is truncated')
+
+    def run(self, screen=None):
+        # plays the recording as fast as it will go, drawing every tick to screen if one is given.
+        # returns the final state
+        state = simulation.GameState(self.level, self.seed, bool(self.flags & ARRAY_PROJECTILES_FLAG))
+        controls = simulation.Controls()
+        queue = renderer.RenderQueue()
+        for bits in self.ticks:
+            if bits & RESTART:
+                state.restart()
+            set_controls(controls, bits)
+            simulation.step(state, controls)
+            # the game moves on to the next level as soon as it is completed, and carries on ticking
+            # after the last one (which a restart then loads again) just like game.py does
+            if state.player.alive and state.level_complete:
+                state.next_level()
+            if screen is not None:
+                draw(screen, state, queue)
+        if self.flags & RESTARTED_FLAG:
+            state.restart()
+        return state
+
+
+def draw(screen, state, queue):
+    # a plain version of the game's drawing, without the background, hud or dirty rects
+    screen.fill(BG)
+    renderer.submit_state(queue, state)
+    queue.flush(screen, False)
+    pygame.display.flip()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a recorded game at full speed and check its final state.')
+    parser.add_argument('path', help='replay file written by the game with RECORD_REPLAY on')
+    parser.add_argument('--render', action='store_true', help='draw every tick (in a window unless headless)')
+    parser.add_argument('--headless', action='store_true', help='use the dummy video driver')
+    parser.add_argument('--repeat', type=int, default=1, help='times to play it, for timing')
+    args = parser.parse_args()
+
+    if args.headless or not args.render:
+        simulation.init_headless()
+    else:
+        pygame.init()
+    replay = Replay(args.path)
+    screen = None
+    if args.render:
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        sprites.preload()
+    matched = True
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        state = replay.run(screen)
+        elapsed = time.perf_counter() - start
+        matched = state_digest(state) == replay.digest
+        print(f'{state.ticks} ticks in {elapsed:.2f}s ({state.ticks / elapsed:.0f} ticks/s), '
+              f'final state {"matches" if matched else "DOES NOT MATCH"}')
+    if not matched:
+        sys.exit(1)
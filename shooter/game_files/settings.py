@@ -10,14 +10,33 @@ GREEN = (0, 255, 0)
 BLACK = (0, 0, 0)
 
 # game variables
-FPS = 60
+FPS = 60  # most frames drawn per second
+TICK_RATE = 60  # simulation steps per second, the same no matter how fast frames are drawn
+MAX_TICKS_PER_FRAME = 5  # steps run before a frame has to be drawn, stops a slow frame snowballing
+MAX_FRAME_SKIP = 5  # frames that can be skipped in a row while the simulation catches up
+ANIMATION_COOLDOWN = 6  # ticks each animation frame is shown for (~100ms)
 GRAVITY = 0.75
 SCROLL_THRESH = 200  # distance player can get to the edge of the screen before scrolling
-ROWS = 16
-COLS = 150
+ROWS = 16  # rows of tiles that fit on the screen, levels can be any size
 TILE_SIZE = SCREEN_HEIGHT // ROWS
 TILE_TYPES = 21
+CHUNK_COLS = 16  # columns of static tiles pre-rendered into each chunk surface
+BG_CACHE_STEP = None  # pixels of scroll per cached background, None draws the layers every frame
+DIRTY_RECTS = False  # only send the changed parts of the screen to the display (full updates while scrolling)
+POOL_CAPACITY = 256  # killed bullets, grenades and explosions kept for reuse (each)
+ARRAY_PROJECTILES = False  # simulate bullets and grenades as numpy arrays (projectiles.py) instead of sprites
+AI_LOD = True  # only enemies near the screen run their full ai every tick
+AI_ACTIVE_MARGIN = TILE_SIZE * 5  # pixels past the edge of the screen where enemies still run their full ai
+AI_PATROL_MARGIN = SCREEN_WIDTH  # past that they just patrol every AI_PATROL_INTERVAL ticks, further out they freeze
+AI_PATROL_INTERVAL = 8
+# pixels past the edge of the screen where level chunks are loaded, beyond where any enemy can move
+STREAM_MARGIN = AI_PATROL_MARGIN + CHUNK_COLS * TILE_SIZE
+PIPELINE = False  # simulate on a second thread while the main thread draws the last tick
+PROFILER = False  # time each stage of the frame, F3 toggles the overlay and F4 records a trace
+TRACE_PATH = 'trace_{}.json'  # where F4 writes the trace, {} is the time it was written
 MAX_LEVELS = 2
-screen_scroll = 0
-bg_scroll = 0
+RECORD_REPLAY = False  # record the controls of every tick, written to REPLAY_PATH on quit for replay.py
+REPLAY_PATH = 'replay_{}.rpl'  # {} is the time it was written
+ASSET_BUNDLE_PATH = 'assets.bundle'  # scaled images baked by bundle.py, used while newer than the pngs
+LEVEL_PATH = '../../level{}_data.csv'  # relative to shooter/game_files, where the game is run from
 
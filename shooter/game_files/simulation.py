@@ -0,0 +1,287 @@
+import argparse
+import os
+import random
+import time
+
+import pygame
+
+import camera
+import levels
+import pools
+import projectiles
+import spatial
+from settings import *
+from sprites import Bullet, Grenade, Explosion, ItemBox, Soldier
+from world import World
+
+
+def init_headless():
+    # lets the simulation (and anything that touches pygame.display) run without opening a window
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.display.init()
+
+
+class Controls:
+    # what the player is asking to do this tick, filled in from the keyboard or by a bot
+    def __init__(self):
+        self.moving_left = False
+        self.moving_right = False
+        self.shoot = False
+        self.grenade = False
+        self.jump = False  # only set for the tick the jump key was pressed
+
+
+class TickClock:
+    # turns real time into fixed steps of 1 / TICK_RATE seconds
+    def __init__(self):
+        self.tick_time = 1 / TICK_RATE
+        self.accumulator = 0.0  # time that has passed but hasn't been simulated yet
+        self.last_time = time.perf_counter()
+
+    def reset(self):
+        # forget the time that has passed, e.g. while the game wasn't running
+        self.accumulator = 0.0
+        self.last_time = time.perf_counter()
+
+    def advance(self):
+        now = time.perf_counter()
+        self.accumulator += min(now - self.last_time, MAX_TICKS_PER_FRAME * self.tick_time)
+        self.last_time = now
+
+    def behind(self):
+        return self.accumulator >= self.tick_time
+
+    def alpha(self):
+        # how far the time that hasn't been simulated is into the next tick
+        return self.accumulator / self.tick_time
+
+    def run(self, tick):
+        # calls tick() as many times as the time passed covers, returns how many ran
+        ticks = 0
+        while self.accumulator >= self.tick_time and ticks < MAX_TICKS_PER_FRAME:
+            tick()
+            self.accumulator -= self.tick_time
+            ticks += 1
+        if ticks == MAX_TICKS_PER_FRAME:
+            # too far behind to catch up, drop the backlog instead of slowing every batch after this one
+            self.accumulator = min(self.accumulator, self.tick_time)
+        return ticks
+
+
+class GameState:
+    # everything the game needs to simulate a level, nothing in here draws or needs a window
+    def __init__(self, level=1, seed=None, array_projectiles=ARRAY_PROJECTILES):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.level = level
+        self.ticks = 0
+        self.enemy_group = pygame.sprite.Group()
+        self.bullet_group = pygame.sprite.Group()
+        self.grenade_group = pygame.sprite.Group()
+        self.explosion_group = pygame.sprite.Group()
+        self.item_box_group = pygame.sprite.Group()
+        self.water_group = pygame.sprite.Group()
+        self.exit_group = pygame.sprite.Group()
+        # bullets and grenades live in the sprite groups above, or here when array_projectiles is on
+        self.projectiles = projectiles.ProjectileSystem() if array_projectiles else None
+        # killed bullets, grenades and explosions are kept here and reused
+        self.bullet_pool = pools.Pool(Bullet, POOL_CAPACITY)
+        self.grenade_pool = pools.Pool(Grenade, POOL_CAPACITY)
+        self.explosion_pool = pools.Pool(Explosion, POOL_CAPACITY)
+        # soldiers, item boxes, water and exits by position, for hits, pickups and triggers
+        self.entity_hash = spatial.SpatialHash(TILE_SIZE * 2)
+        self.camera = camera.Camera(SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.world = None
+        self.player = None
+        self.active_enemies = []  # enemies near the screen, the only ones that can be seen
+        self.grenade_thrown = False  # stops holding the grenade key from throwing more than one
+        self.level_complete = False
+        self.load_level(level)
+
+    def clear(self):
+        for group in (self.bullet_group, self.grenade_group, self.explosion_group):
+            for sprite in group.sprites():
+                sprite.kill()  # back to its pool
+        self.enemy_group.empty()
+        self.active_enemies = []
+        self.item_box_group.empty()
+        self.water_group.empty()
+        self.exit_group.empty()
+        self.entity_hash.clear()
+        if self.projectiles is not None:
+            self.projectiles.clear()
+
+    def load_level(self, level, preloader=None):
+        # uses the level from preloader (a levels.Preloader) if it has it ready
+        self.level = level
+        prepared = preloader.take(level) if preloader is not None else None
+        if prepared is None:
+            self.load_data(levels.load_level(level))
+        else:
+            self.load_world(*prepared)
+
+    def load_data(self, data):
+        # builds the world from a (rows, columns) grid of tile numbers
+        world = World()
+        self.load_world(world, world.process_data(data))
+
+    def load_world(self, world, player):
+        self.clear()
+        self.level_complete = False
+        self.world = world
+        self.player = player
+        self.camera.reset(self.world.level_length * TILE_SIZE)
+        self.entity_hash.insert(self.player, self.player.rect)
+        self.world.stream(self)  # the chunks around the start, the rest load as the camera gets near them
+        self.active_enemies = list(self.enemy_group)
+
+    def pool_stats(self):
+        return {'bullets': self.bullet_pool.stats(), 'grenades': self.grenade_pool.stats(),
+                'explosions': self.explosion_pool.stats()}
+
+    def restart(self):
+        self.load_level(self.level)
+
+    def next_level(self, preloader=None):
+        # returns False once the last level has been completed. level stays at the last one then,
+        # so restart() still has a level to load
+        if self.level >= MAX_LEVELS:
+            self.clear()
+            return False
+        self.level += 1
+        self.load_level(self.level, preloader)
+        return True
+
+
+def resolve_combat(state):
+    # every bullet hits at most one living soldier, found through the entity hash
+    player = state.player
+    for bullet in state.bullet_group:
+        for soldier in state.entity_hash.query(bullet.rect):
+            if isinstance(soldier, Soldier) and soldier.alive and soldier.rect.colliderect(bullet.rect):
+                if soldier is player:
+                    soldier.health -= 5
+                else:
+                    soldier.health -= 25
+                bullet.kill()
+                break
+
+
+def collect_items(state):
+    # picks up the item boxes the player is touching
+    player = state.player
+    for item_box in state.entity_hash.query(player.rect):
+        if isinstance(item_box, ItemBox) and item_box.rect.colliderect(player.rect):
+            item_box.collect(state)
+
+
+def update_enemies(state):
+    # enemies near the screen run their full ai every tick. further out they take a coarse patrol step
+    # every AI_PATROL_INTERVAL ticks (spread over the ticks by their order in the group) and far away
+    # they are frozen until the camera comes back into range
+    camera = state.camera
+    view_left = camera.x
+    view_right = camera.x + camera.width
+    active = []
+    for i, enemy in enumerate(state.enemy_group):
+        distance = max(view_left - enemy.rect.right, enemy.rect.left - view_right, 0)
+        if not AI_LOD or distance <= AI_ACTIVE_MARGIN:
+            active.append(enemy)
+            enemy.ai(state)
+            enemy.update(state)
+        elif distance <= AI_PATROL_MARGIN and (state.ticks + i) % AI_PATROL_INTERVAL == 0:
+            enemy.patrol(state, AI_PATROL_INTERVAL)
+            enemy.update(state)
+    state.active_enemies = active
+
+
+def save_positions(state):
+    # remembers where everything that moves was at the start of the tick so frames can be drawn in between
+    state.camera.last_x = state.camera.x
+    state.player.last_pos = state.player.rect.topleft
+    for group in (state.enemy_group, state.bullet_group, state.grenade_group):
+        for sprite in group:
+            sprite.last_pos = sprite.rect.topleft
+    if state.projectiles is not None:
+        state.projectiles.save_positions()
+
+
+def step(state, controls):
+    # advances the game by one tick (1 / TICK_RATE seconds)
+    player = state.player
+    state.level_complete = False
+    save_positions(state)
+    state.world.stream(state)
+
+    player.update(state)
+    update_enemies(state)
+    if state.projectiles is not None:
+        state.projectiles.update_bullets(state)
+    else:
+        state.bullet_group.update(state)
+        resolve_combat(state)
+    state.explosion_group.update(state)
+    collect_items(state)
+    if state.projectiles is not None:
+        state.projectiles.update_grenades(state)
+    else:
+        state.grenade_group.update(state)
+
+    if not controls.grenade:
+        state.grenade_thrown = False
+    if player.alive:
+        if controls.jump:
+            player.jump = True
+        # shooting
+        if controls.shoot:
+            player.shoot(state)
+        elif controls.grenade and not state.grenade_thrown and player.grenades > 0:
+            # creates the grenade just above/in front of player head
+            x = player.rect.centerx + (0.5 * player.rect.size[0] * player.direction)
+            if state.projectiles is not None:
+                state.projectiles.spawn_grenade(x, player.rect.top, player.direction)
+            else:
+                state.grenade_group.add(state.grenade_pool.acquire(x, player.rect.top, player.direction))
+            player.grenades -= 1
+            state.grenade_thrown = True
+        if player.in_air:
+            player.update_action(2)  # 2 = jump
+        elif controls.moving_left or controls.moving_right:
+            player.update_action(1)  # 1 = Run animation
+        else:
+            player.update_action(0)  # 0 = idle animation
+        state.level_complete = player.move(state, controls.moving_left, controls.moving_right)
+
+    state.ticks += 1
+
+
+def run_headless(ticks, level=1, seed=None, bot=None, array_projectiles=ARRAY_PROJECTILES):
+    # runs the game flat out with no window, bot(state, controls) can change the controls every tick
+    init_headless()
+    state = GameState(level, seed, array_projectiles)
+    controls = Controls()
+    for _ in range(ticks):
+        if bot is not None:
+            bot(state, controls)
+        step(state, controls)
+        if state.level_complete or not state.player.alive:
+            break
+    return state
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the game with no window and report the tick rate.')
+    parser.add_argument('--ticks', type=int, default=10000)
+    parser.add_argument('--level', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--array-projectiles', action='store_true', default=ARRAY_PROJECTILES,
+                        help='simulate bullets and grenades with the numpy projectile system')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = run_headless(args.ticks, args.level, args.seed, array_projectiles=args.array_projectiles)
+    elapsed = time.perf_counter() - start
+    print(f'{result.ticks} ticks in {elapsed:.2f}s ({result.ticks / elapsed:.0f} ticks/s)')
+    for name, stats in result.pool_stats().items():
+        print(f'{name} pool: {stats["hits"]} hits, {stats["misses"]} misses, {stats["free"]} free')
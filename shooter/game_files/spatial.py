@@ -0,0 +1,59 @@
+import pygame
+
+
+class SpatialHash:
+    # buckets items into square cells by their rect so overlap queries only look at nearby items
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.item_cells = {}  # item -> the cell range it is stored under, so it can be moved or removed
+
+    def clear(self):
+        self.cells.clear()
+        self.item_cells.clear()
+
+    def cell_range(self, rect):
+        # first/last column and row of the cells rect touches
+        size = self.cell_size
+        return rect.left // size, rect.right // size, rect.top // size, rect.bottom // size
+
+    def insert(self, item, rect):
+        if item in self.item_cells:
+            self.remove(item)
+        cell_range = self.cell_range(rect)
+        self.item_cells[item] = cell_range
+        first_col, last_col, first_row, last_row = cell_range
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                self.cells.setdefault((col, row), []).append(item)
+
+    def remove(self, item):
+        cell_range = self.item_cells.pop(item, None)
+        if cell_range is None:
+            return
+        first_col, last_col, first_row, last_row = cell_range
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                cell = self.cells[(col, row)]
+                cell.remove(item)
+                if not cell:
+                    del self.cells[(col, row)]
+
+    def update(self, item, rect):
+        # call after item moves, only touches the cells when it has crossed into different ones
+        if self.item_cells.get(item) != self.cell_range(rect):
+            self.insert(item, rect)
+
+    def query(self, rect):
+        # items sharing a cell with rect, each returned once in insertion order per cell
+        found = {}
+        first_col, last_col, first_row, last_row = self.cell_range(rect)
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                for item in self.cells.get((col, row), ()):
+                    found[item] = None
+        return list(found)
+
+    def query_radius(self, x, y, radius):
+        # items sharing a cell with the square that holds the circle, callers do the exact distance test
+        return self.query(pygame.Rect(x - radius, y - radius, radius * 2, radius * 2))
@@ -0,0 +1,410 @@
+import pygame
+
+import assets
+import pools
+from renderer import LAYER_PLAYER, LAYER_SOLDIERS
+from settings import *
+
+SOLDIER_SCALE = 1.65
+EXPLOSION_FRAMES = [f'../images/Explosion/exp{num}.png' for num in range(1, 6)]
+ITEM_BOX_IMAGES = {
+    'Health': '../images/icons/health_box.png',
+    'Ammo': '../images/icons/ammo_box.png',
+    'Grenade': '../images/icons/grenade_box.png'
+}
+
+
+def preload():
+    # sprite animations are loaded once up front and shared by every Soldier and Explosion
+    for char_type in ('player', 'enemy'):
+        for flip in (False, True):
+            assets.cache.get_animations(f'../images/{char_type}', SOLDIER_SCALE, flip)
+    assets.cache.preload(EXPLOSION_FRAMES, 2)
+    assets.cache.preload(ITEM_BOX_IMAGES.values())
+    assets.cache.preload(['../images/icons/bullet.png', '../images/icons/grenade.png'])
+
+
+def soldiers_near(state, x, y, distance):
+    # soldiers whose centre is less than distance from (x, y) on both axes, looked up in state.entity_hash
+    return [soldier for soldier in state.entity_hash.query_radius(x, y, distance)
+            if isinstance(soldier, Soldier) and abs(x - soldier.rect.centerx) < distance
+            and abs(y - soldier.rect.centery) < distance]
+
+
+class Soldier(pygame.sprite.Sprite):
+    def __init__(self, char_type, x, y, scale, speed, ammo, grenades=0, health=100):
+        pygame.sprite.Sprite.__init__(self)
+        self.alive = True
+        self.char_type = char_type
+        self.speed = speed
+        self.health = health
+        self.max_health = self.health
+        self.ammo = ammo
+        self.start_ammo = ammo
+        self.grenades = grenades
+        self.shoot_cooldown = 0
+        self.direction = 1
+        self.vel_y = 0  # vertical velocity
+        self.jump = False
+        self.in_air = True  # assume player is in the air until it lands on something
+        self.flip = False
+        self.frame_index = 0  # Current index of the frame within the animation list
+        self.action = 0  # Current index of the animation list being used
+        self.animation_timer = 0  # ticks the current frame has been shown for
+        # frames are shared with every other soldier of the same type,
+        # facing left is drawn from a second set of frames that are flipped ahead of time
+        self.animation_list = assets.cache.get_animations(f'../images/{self.char_type}', scale)
+        self.flipped_animation_list = assets.cache.get_animations(f'../images/{self.char_type}', scale, True)
+
+        # ai specific variables
+        self.move_counter = 0
+        self.vision = pygame.Rect(0, 0, 150, 20)
+        self.idling = False
+        self.idling_counter = 0
+
+        self.image = self.animation_list[self.action][self.frame_index]
+        self.flipped_image = self.flipped_animation_list[self.action][self.frame_index]
+        self.rect = self.image.get_rect()
+        self.rect.center = (x, y)
+        self.last_pos = self.rect.topleft  # position at the start of the tick, for drawing between ticks
+        self.width = self.image.get_width()
+        self.height = self.image.get_height()
+
+    def update(self, state):
+        self.update_animation()
+        self.check_alive()
+        # update cooldown
+        if self.shoot_cooldown > 0:
+            self.shoot_cooldown -= 1
+
+    def move(self, state, moving_left, moving_right, steps=1):
+        # dx and dy represent delta x,y (the amount of change in the coordinates)
+        # steps > 1 covers that many ticks of walking in one move
+        dx = 0
+        dy = 0
+
+        if moving_left:
+            dx = -self.speed * steps
+            self.flip = True
+            self.direction = -1
+        if moving_right:
+            dx = self.speed * steps
+            self.flip = False
+            self.direction = 1
+
+        # JUMP
+        if self.jump and not self.in_air:
+            self.vel_y = -12
+            self.jump = False
+            self.in_air = True
+
+        self.vel_y += GRAVITY
+        if self.vel_y > 10:
+            self.vel_y = 10
+        dy += self.vel_y
+
+        # check for collision (only tiles in the cells the move sweeps through)
+        # (built like the colliderect calls below, Rect.move would round a fractional dy the other way)
+        moved = pygame.Rect(self.rect.x + dx, self.rect.y + dy, self.width, self.height)
+        for tile in state.world.obstacles_near(self.rect.union(moved)):
+            # check x
+            if tile[1].colliderect(self.rect.x + dx, self.rect.y, self.width, self.height):
+                dx = 0
+                if self.char_type == 'enemy':  # turn ai character around if they hit a wall
+                    self.direction *= -1
+                    self.move_counter = 0
+
+            # check y direction
+            if tile[1].colliderect(self.rect.x, self.rect.y + dy, self.width, self.height):
+                # if below ground (jumping)
+                if self.vel_y < 0:
+                    self.vel_y = 0
+                    dy = tile[1].bottom - self.rect.top
+                # if above ground (falling)
+                elif self.vel_y >= 0:
+                    self.vel_y = 0
+                    self.in_air = False
+                    dy = tile[1].top - self.rect.bottom
+
+        # check for collision w/ water and the exit
+        level_complete = False
+        for thing in state.entity_hash.query(self.rect):
+            if isinstance(thing, Water) and thing.rect.colliderect(self.rect):
+                self.health = 0
+            elif isinstance(thing, Exit) and thing.rect.colliderect(self.rect):
+                level_complete = True
+
+        # check if player falls off map
+        if self.rect.bottom > SCREEN_HEIGHT:
+            self.health = 0
+
+        # check if player going off of the screen
+        camera = state.camera
+        if self.char_type == 'player':
+            if self.rect.left + dx < camera.x or self.rect.right + dx > camera.x + SCREEN_WIDTH:
+                dx = 0
+        # update player rectangle
+        self.rect.x += dx
+        self.rect.y += dy
+        state.entity_hash.update(self, self.rect)
+
+        # move the camera with the player
+        if self.char_type == 'player':
+            camera.follow(self.rect, dx, SCROLL_THRESH)
+
+        return level_complete
+
+    def shoot(self, state):
+        # creates a bullet at the end of the Soldiers barrel
+        if self.shoot_cooldown == 0 and self.ammo > 0:
+            self.shoot_cooldown = 20
+            x = self.rect.centerx + (0.75 * self.rect.size[0] * self.direction)
+            if state.projectiles is not None:
+                state.projectiles.spawn_bullet(x, self.rect.centery, self.direction)
+            else:
+                state.bullet_group.add(state.bullet_pool.acquire(x, self.rect.centery, self.direction))
+            self.ammo -= 1  # reduces ammo
+
+    def ai(self, state):
+        player = state.player
+        if self.alive and player.alive:
+            if not self.idling and state.rng.randint(1, 200) == 1:  # if random # = 1 then ai enemy will idle
+                self.update_action(0)  # Idle animation
+                self.idling = True
+                self.idling_counter = 50
+            if self.vision.colliderect(player.rect):  # if the enemy can 'see' the player
+                # stop running and face player
+                self.update_action(0)
+                self.direction = player.direction * -1
+                self.shoot(state)
+            else:
+                if not self.idling:
+                    if self.direction == 1:
+                        ai_moving_right = True
+                    else:
+                        ai_moving_right = False
+                    ai_moving_left = not ai_moving_right
+                    self.move(state, ai_moving_left, ai_moving_right)
+                    self.update_action(1)  # Run animation
+
+                    self.vision.center = (self.rect.centerx + 75 * self.direction, self.rect.centery)
+                    self.move_counter += 1
+                    if self.move_counter > TILE_SIZE:
+                        self.direction *= -1
+                        self.move_counter *= -1
+                else:
+                    self.idling_counter -= 1
+                    if self.idling_counter <= 0:
+                        self.idling = False
+
+    def patrol(self, state, ticks):
+        # cheap stand in for ai() when the enemy is too far away to see the player, run once every `ticks` ticks.
+        # walks back and forth like ai() does but in one move, without idling at random
+        if not self.alive:
+            return
+        if self.idling:
+            self.idling_counter -= ticks
+            if self.idling_counter <= 0:
+                self.idling = False
+            return
+        self.move(state, self.direction == -1, self.direction == 1, ticks)
+        self.update_action(1)  # Run animation
+        self.vision.center = (self.rect.centerx + 75 * self.direction, self.rect.centery)
+        self.move_counter += ticks
+        if self.move_counter > TILE_SIZE:
+            self.direction *= -1
+            self.move_counter *= -1
+
+    def update_animation(self):
+        self.image = self.animation_list[self.action][self.frame_index]  # updates image to frame in current list
+        self.flipped_image = self.flipped_animation_list[self.action][self.frame_index]
+        self.animation_timer += 1
+        if self.animation_timer > ANIMATION_COOLDOWN:
+            # checks if enough ticks have passed since the last update
+            self.animation_timer = 0
+            self.frame_index += 1
+        if self.frame_index >= len(self.animation_list[self.action]):  # loops the animation
+            if self.action == 3:  # if the player is dead don't loop Death animation
+                self.frame_index = len(self.animation_list[self.action]) - 1
+            else:
+                self.frame_index = 0
+
+    def update_action(self, new_action):
+        # If new action is different
+        if new_action != self.action:
+            self.action = new_action
+            # update animation settings
+            self.frame_index = 0
+            self.animation_timer = 0
+
+    def check_alive(self):
+        if self.health <= 0:
+            self.health = 0
+            self.speed = 0
+            self.alive = False
+            self.update_action(3)
+
+    def draw(self, queue, camera):
+        # submits the soldier to a renderer.RenderQueue when it is on screen
+        pos = camera.screen_pos(self)
+        if camera.on_screen(pos, self.rect.size):
+            image = self.flipped_image if self.flip else self.image
+            queue.submit(image, pos, LAYER_PLAYER if self.char_type == 'player' else LAYER_SOLDIERS)
+
+
+class Water(pygame.sprite.Sprite):
+    def __init__(self, img, x, y):
+        pygame.sprite.Sprite.__init__(self)
+        self.image = img
+        self.rect = self.image.get_rect()
+        self.rect.midtop = (x + TILE_SIZE // 2, y + (TILE_SIZE - self.image.get_height()))
+
+
+class Exit(pygame.sprite.Sprite):
+    def __init__(self, img, x, y):
+        pygame.sprite.Sprite.__init__(self)
+        self.image = img
+        self.rect = self.image.get_rect()
+        self.rect.midtop = (x + TILE_SIZE // 2, y + (TILE_SIZE - self.image.get_height()))
+
+
+class ItemBox(pygame.sprite.Sprite):
+    def __init__(self, item_type, x, y):
+        pygame.sprite.Sprite.__init__(self)
+        self.item_type = item_type
+        self.image = assets.cache.get(ITEM_BOX_IMAGES[self.item_type])
+        self.rect = self.image.get_rect()
+        self.rect.midtop = (x + TILE_SIZE // 2, y + (TILE_SIZE - self.image.get_height()))
+
+    def collect(self, state):
+        # gives the player what's in the box, called once the player is touching it
+        player = state.player
+        # check box type
+        if self.item_type == 'Health':
+            player.health += 25
+            if player.health > player.max_health:
+                player.health = player.max_health
+        elif self.item_type == 'Ammo':
+            player.ammo += 15
+        elif self.item_type == 'Grenade':
+            player.grenades += 3
+        # delete box
+        self.kill()
+        state.entity_hash.remove(self)
+
+
+class Bullet(pools.PooledSprite):
+    def __init__(self, x, y, direction):
+        pools.PooledSprite.__init__(self)
+        self.speed = 10
+        self.image = assets.cache.get('../images/icons/bullet.png')
+        self.rect = self.image.get_rect()
+        self.reset(x, y, direction)
+
+    def reset(self, x, y, direction):
+        self.rect.center = (x, y)
+        self.last_pos = self.rect.topleft
+        self.direction = direction
+
+    def update(self, state):
+        # moves bullet
+        self.rect.x += (self.direction * self.speed)
+        # check if bullet leaves screen
+        if self.rect.right < state.camera.x or self.rect.left > state.camera.x + SCREEN_WIDTH:
+            self.kill()
+
+        # check collision
+
+        for tile in state.world.obstacles_near(self.rect):
+            if tile[1].colliderect(self.rect):
+                self.kill()
+        # hits on soldiers are handled once per frame in simulation.resolve_combat
+
+
+class Grenade(pools.PooledSprite):
+    def __init__(self, x, y, direction):
+        pools.PooledSprite.__init__(self)
+        self.image = assets.cache.get('../images/icons/grenade.png')
+        self.rect = self.image.get_rect()
+        self.width = self.image.get_width()
+        self.height = self.image.get_height()
+        self.reset(x, y, direction)
+
+    def reset(self, x, y, direction):
+        self.timer = 100
+        self.vel_y = -11
+        self.speed = 7
+        self.rect.center = (x, y)
+        self.last_pos = self.rect.topleft
+        self.direction = direction
+
+    def update(self, state):
+        self.vel_y += GRAVITY
+        dx = self.direction * self.speed
+        dy = self.vel_y
+
+        # check collision w/ floor
+        # (area is widened both ways on x because a bounce reverses dx mid-loop)
+        sweep = self.rect.inflate(abs(dx) * 2, 0).union((self.rect.x, self.rect.y + dy, self.width, self.height))
+        for tile in state.world.obstacles_near(sweep):
+            if tile[1].colliderect(self.rect.x + dx, self.rect.y, self.width, self.height):
+                self.direction *= -1
+                dx = self.direction * self.speed
+                # check y direction
+            if tile[1].colliderect(self.rect.x, self.rect.y + dy, self.width, self.height):
+                self.speed = 0
+                # if below ground (thrown up)
+                if self.vel_y < 0:
+                    self.vel_y = 0
+                    dy = tile[1].bottom - self.rect.top
+                # if above ground (falling)
+                elif self.vel_y >= 0:
+                    self.vel_y = 0
+                    dy = tile[1].top - self.rect.bottom
+
+        # check for collision w/ wall (bounces off of walls)
+        camera = state.camera
+        if self.rect.left + dx < camera.x or self.rect.right + dx > camera.x + SCREEN_WIDTH:
+            self.direction *= -1
+            dx = self.direction * self.speed
+
+        # update position
+        self.rect.x += dx
+        self.rect.y += dy
+
+        # countdown timer
+        self.timer -= 1
+        if self.timer <= 0:
+            self.kill()
+            explosion = state.explosion_pool.acquire(self.rect.x, self.rect.y, 2)
+            state.explosion_group.add(explosion)
+            # damage nearby Soldiers
+            for soldier in soldiers_near(state, self.rect.centerx, self.rect.centery, TILE_SIZE * 2):
+                soldier.health -= 50
+
+
+class Explosion(pools.PooledSprite):
+    def __init__(self, x, y, scale):
+        pools.PooledSprite.__init__(self)
+        self.reset(x, y, scale)
+
+    def reset(self, x, y, scale):
+        self.images = assets.cache.get_frames(EXPLOSION_FRAMES, scale)
+        self.frame_index = 0
+        self.image = self.images[self.frame_index]
+        self.rect = self.image.get_rect()
+        self.rect.center = (x, y)
+        self.counter = 0
+
+    def update(self, state):
+        EXPLOSION_SPEED = 4
+        # update animation
+        self.counter += 1
+        if self.counter >= EXPLOSION_SPEED:
+            self.counter = 0
+            self.frame_index += 1
+            # if animation complete delete explosion
+            if self.frame_index >= len(self.images):
+                self.kill()
+            else:
+                self.image = self.images[self.frame_index]
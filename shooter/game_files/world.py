@@ -0,0 +1,196 @@
+import numpy as np
+import pygame
+
+import assets
+from renderer import LAYER_WORLD
+from settings import *
+from sprites import Soldier, Water, Exit, ItemBox, SOLDIER_SCALE, EXPLOSION_FRAMES, ITEM_BOX_IMAGES
+
+ITEM_BOX_TILES = {17: 'Ammo', 18: 'Grenade', 19: 'Health'}
+
+
+TILE_PATHS = [f'../images/tile/{x}.png' for x in range(TILE_TYPES)]
+
+
+def tile_images():
+    return assets.cache.get_frames(TILE_PATHS, (TILE_SIZE, TILE_SIZE))
+
+
+def level_images(data):
+    # the (path, scale, flip) cache keys of every image a level can show, for loading ahead of time
+    keys = [(path, (TILE_SIZE, TILE_SIZE), False) for path in TILE_PATHS]
+    for tile, char_type in ((15, 'player'), (16, 'enemy')):
+        if (data == tile).any():
+            for paths in assets.animation_paths(f'../images/{char_type}'):
+                keys += [(path, SOLDIER_SCALE, flip) for path in paths for flip in (False, True)]
+    keys += [(path, 1, False) for path in ITEM_BOX_IMAGES.values()]
+    keys += [(path, 2, False) for path in EXPLOSION_FRAMES]
+    return keys
+
+
+class World:
+    # the level is split into chunks of CHUNK_COLS columns. a chunk's sprites are only in the game while
+    # the camera is near it (see stream) and its tiles are only made into rects and images when needed
+    def __init__(self):
+        self.data = None  # the level's (rows, columns) grid of tile numbers
+        self.level_length = None
+        self.height = 0
+        self.num_chunks = 0
+        self.img_list = []
+        self.solid = np.zeros((0, 0), dtype=bool)  # True where there is an obstacle tile
+        self.chunk_tiles = {}  # chunk -> its obstacle tiles indexed by [row][column in chunk]
+        self.chunks = {}  # chunk -> its static tiles pre-rendered onto one surface, made when first drawn
+        self.loaded = {}  # chunk -> [(spawn key, sprite, group)] of the sprites it has put in the game
+        self.stored = {}  # spawn key -> enemy of an unloaded chunk, put back as it was when the chunk loads
+        self.removed = set()  # spawn keys of sprites that are gone for good (collected item boxes)
+
+    def process_data(self, data):
+        # sets up the level from a (rows, columns) grid of tile numbers and returns the player,
+        # everything else is added to state a chunk at a time by stream()
+        data = np.asarray(data)
+        self.data = data
+        self.img_list = tile_images()
+        self.level_length = data.shape[1]  # how wide the level is
+        self.height = len(data) * TILE_SIZE
+        self.num_chunks = (self.level_length + CHUNK_COLS - 1) // CHUNK_COLS
+        self.solid = (data >= 0) & (data <= 8)
+        player = None
+        spawns = np.argwhere(data == 15)
+        if len(spawns):  # create player
+            y, x = spawns[-1].tolist()
+            player = Soldier('player', x * TILE_SIZE, y * TILE_SIZE, SOLDIER_SCALE, 6, grenades=5, ammo=20)
+        return player
+
+    def enemies(self, state):
+        # every enemy made so far, including the ones waiting in unloaded chunks
+        return list(state.enemy_group) + list(self.stored.values())
+
+    def load_all(self, state):
+        # puts every chunk's sprites in the game, for tools that want the whole level at once
+        for i in range(self.num_chunks):
+            if i not in self.loaded:
+                self.load_chunk(i, state)
+
+    def make_sprite(self, tile, x, y, state):
+        # the sprite for the tile at column x, row y and the group it goes in, (None, None) for scenery
+        if 9 <= tile <= 10:
+            return Water(self.img_list[tile], x * TILE_SIZE, y * TILE_SIZE), state.water_group
+        if tile == 16:  # create enemy
+            enemy = Soldier('enemy', x * TILE_SIZE, y * TILE_SIZE, SOLDIER_SCALE, speed=2, ammo=20)
+            return enemy, state.enemy_group
+        if tile in ITEM_BOX_TILES:
+            return ItemBox(ITEM_BOX_TILES[tile], x * TILE_SIZE, y * TILE_SIZE), state.item_box_group
+        if tile == 20:  # EXIT
+            return Exit(self.img_list[tile], x * TILE_SIZE, y * TILE_SIZE), state.exit_group
+        return None, None
+
+    def load_chunk(self, i, state):
+        # adds the sprites of chunk i to the game, row by row
+        first_col = i * CHUNK_COLS
+        block = self.data[:, first_col:first_col + CHUNK_COLS]
+        entities = []
+        for y, x in np.argwhere(block >= 9).tolist():
+            key = (y, first_col + x)
+            if key in self.removed:
+                continue
+            sprite = self.stored.pop(key, None)
+            if sprite is not None:
+                group = state.enemy_group
+            else:
+                sprite, group = self.make_sprite(int(block[y, x]), first_col + x, y, state)
+                if sprite is None:
+                    continue
+            group.add(sprite)
+            state.entity_hash.insert(sprite, sprite.rect)
+            entities.append((key, sprite, group))
+        self.loaded[i] = entities
+
+    def unload_chunk(self, i, state):
+        # takes chunk i's sprites out of the game. enemies are kept as they are, dead or alive,
+        # the rest are made again from the level data unless they were used up
+        for key, sprite, group in self.loaded.pop(i):
+            if not group.has(sprite):
+                self.removed.add(key)
+                continue
+            group.remove(sprite)
+            state.entity_hash.remove(sprite)
+            if isinstance(sprite, Soldier):
+                self.stored[key] = sprite
+        self.chunks.pop(i, None)
+        self.chunk_tiles.pop(i, None)
+
+    def stream(self, state):
+        # loads the chunks within STREAM_MARGIN of the screen and unloads the ones more than a chunk past that
+        chunk_width = CHUNK_COLS * TILE_SIZE
+        camera = state.camera
+        first = max((camera.x - STREAM_MARGIN) // chunk_width, 0)
+        last = min((camera.x + camera.width + STREAM_MARGIN) // chunk_width, self.num_chunks - 1)
+        for i in range(first, last + 1):
+            if i not in self.loaded:
+                self.load_chunk(i, state)
+        for i in [i for i in self.loaded if i < first - 1 or i > last + 1]:
+            self.unload_chunk(i, state)
+        # tiles and surfaces made for chunks that were never loaded (by a draw or a collision out there)
+        for made in (self.chunks, self.chunk_tiles):
+            if len(made) > last - first + 3:
+                for i in [i for i in made if i < first - 1 or i > last + 1]:
+                    del made[i]
+
+    def chunk_obstacles(self, i):
+        # the obstacle tiles of chunk i as [row][column in chunk], made when first needed
+        tiles = self.chunk_tiles.get(i)
+        if tiles is None:
+            first_col = i * CHUNK_COLS
+            tiles = [[None] * CHUNK_COLS for _ in range(len(self.data))]
+            for y, x in np.argwhere(self.solid[:, first_col:first_col + CHUNK_COLS]).tolist():
+                img = self.img_list[int(self.data[y, first_col + x])]
+                img_rect = img.get_rect()
+                img_rect.x = (first_col + x) * TILE_SIZE
+                img_rect.y = y * TILE_SIZE
+                tiles[y][x] = (img, img_rect)
+            self.chunk_tiles[i] = tiles
+        return tiles
+
+    def obstacles_near(self, rect):
+        # returns the obstacle tiles in the grid cells that rect overlaps, row by row
+        # (the order the whole level used to be checked in) so collision responses don't change
+        first_col = max(rect.left // TILE_SIZE, 0)
+        last_col = min(rect.right // TILE_SIZE, self.level_length - 1)
+        first_row = max(rect.top // TILE_SIZE, 0)
+        last_row = min(rect.bottom // TILE_SIZE, len(self.data) - 1)
+        tiles = []
+        if first_col > last_col:
+            return tiles
+        chunks = [(self.chunk_obstacles(i), i * CHUNK_COLS)
+                  for i in range(first_col // CHUNK_COLS, last_col // CHUNK_COLS + 1)]
+        for row in range(first_row, last_row + 1):
+            for chunk, start in chunks:
+                for tile in chunk[row][max(first_col - start, 0):last_col - start + 1]:
+                    if tile is not None:
+                        tiles.append(tile)
+        return tiles
+
+    def bake_chunk(self, i):
+        # draws the obstacles and decorations of chunk i onto one surface
+        chunk = pygame.Surface((CHUNK_COLS * TILE_SIZE, self.height), pygame.SRCALPHA)
+        block = self.data[:, i * CHUNK_COLS:(i + 1) * CHUNK_COLS]
+        for y, x in np.argwhere(block >= 0).tolist():
+            tile = int(block[y, x])
+            if tile <= 8 or 11 <= tile <= 14:  # decorations don't do anything so they are baked with the tiles
+                img = self.img_list[tile]
+                chunk.blit(img, (x * TILE_SIZE + (TILE_SIZE - img.get_width()) // 2,
+                                 y * TILE_SIZE + TILE_SIZE - img.get_height()))
+        self.chunks[i] = chunk
+        return chunk
+
+    def draw(self, queue, camera):
+        # submits the chunks overlapping the screen to a renderer.RenderQueue
+        chunk_width = CHUNK_COLS * TILE_SIZE
+        camera_x = camera.render_x
+        first_chunk = max(camera_x // chunk_width, 0)
+        last_chunk = min((camera_x + camera.width - 1) // chunk_width, self.num_chunks - 1)
+        for i in range(first_chunk, last_chunk + 1):
+            chunk = self.chunks.get(i)
+            if chunk is None:
+                chunk = self.bake_chunk(i)
+            queue.submit(chunk, (i * chunk_width - camera_x, 0), LAYER_WORLD)